@@ -0,0 +1,122 @@
+"""Build many sites in one warm process, or a pool of them.
+
+Sites built by the same process share its BuildCache: a theme's compiled
+templates are reused by every site that uses it unmodified, and Markdown
+rendered for one site is reused by any other with the same source.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import glob
+import io
+import math
+import os
+import time
+
+from . import config
+from .cache import BuildCache, default_cache
+from .generator import generate_site, get_markdown, load_config
+
+
+def find_sites(patterns: list[str]) -> list[str]:
+    """Expand site roots and glob patterns into site directories.
+
+    Only directories containing a `_config.yaml` count as sites; each is
+    returned once, in the order the patterns name them.
+    """
+    sites = []
+    for pattern in patterns:
+        for match in sorted(glob.glob(os.path.expanduser(pattern))):
+            if (
+                os.path.isfile(os.path.join(match, "_config.yaml"))
+                and match not in sites
+            ):
+                sites.append(match)
+    return sites
+
+
+def site_outputs(sites: list[str], output_root: str) -> dict[str, str]:
+    """Map each site to `output_root/<site directory name>`."""
+    outputs = {}
+    for site in sites:
+        output = os.path.join(output_root, os.path.basename(os.path.normpath(site)))
+        if output in outputs.values():
+            raise ValueError(f"Several sites would be built into {output}")
+        outputs[site] = output
+    return outputs
+
+
+def _theme(site: str) -> str:
+    try:
+        return load_config(site).get("theme", config.DEFAULT_THEME)
+    except Exception:
+        return ""
+
+
+def build_one(site: str, output: str, cache: BuildCache | None = None) -> dict:
+    """Build one site, capturing its log; a failure is reported, not raised."""
+    log = io.StringIO()
+    start = time.perf_counter()
+    result = {"site": site, "output": output, "stats": None, "error": None}
+    with contextlib.redirect_stdout(log):
+        try:
+            result["stats"] = generate_site(site, output, cache=cache)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+    result["log"] = log.getvalue()
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def _build_in_worker(job: tuple[str, str]) -> dict:
+    # Each worker process keeps its own default cache warm across its jobs.
+    return build_one(*job)
+
+
+def build_sites(
+    sites: list[str],
+    output_root: str,
+    workers: int = 1,
+    cache: BuildCache | None = None,
+) -> list[dict]:
+    """Build every site into its own directory under `output_root`.
+
+    Sites are scheduled grouped by theme, so consecutive builds in a process
+    reuse the same compiled templates. With `workers` > 1 the sites are
+    split into that many contiguous runs, one per worker process. Results
+    are returned in the order of `sites`.
+    """
+    outputs = site_outputs(sites, output_root)
+    order = sorted(sites, key=lambda site: (_theme(site), sites.index(site)))
+    jobs = [(site, outputs[site]) for site in order]
+
+    if workers > 1 and len(jobs) > 1:
+        workers = min(workers, len(jobs))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(
+                executor.map(
+                    _build_in_worker, jobs, chunksize=math.ceil(len(jobs) / workers)
+                )
+            )
+    else:
+        cache = cache or default_cache
+        get_markdown()
+        results = [build_one(site, output, cache) for site, output in jobs]
+
+    by_site = {result["site"]: result for result in results}
+    return [by_site[site] for site in sites]
+
+
+def summarize(results: list[dict], elapsed: float) -> dict:
+    """Aggregate per-site results into totals and pages per second."""
+    built = [result["stats"] for result in results if result["stats"] is not None]
+    pages = sum(stats["pages"] for stats in built)
+    return {
+        "sites": len(results),
+        "failed": len(results) - len(built),
+        "pages": pages,
+        "unchanged": sum(stats.get("unchanged", 0) for stats in built),
+        "errors": sum(stats["errors"] for stats in built),
+        "seconds": elapsed,
+        "pages_per_second": pages / elapsed if elapsed > 0 else 0.0,
+    }
@@ -0,0 +1,386 @@
+from copy import deepcopy
+from datetime import date, datetime
+import hashlib
+import io
+import json
+import os
+import tarfile
+from typing import Callable
+
+from jinja2.bccache import BytecodeCache, bc_magic
+
+from . import __version__, config
+
+MANIFEST_VERSION = 1
+ARCHIVE_VERSION = 1
+
+
+def content_digest(content: str) -> str:
+    """Return a stable digest of a piece of page content."""
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+class FragmentStore:
+    """Rendered template fragments for one build, keyed by explicit keys."""
+
+    def __init__(self):
+        self.fragments: dict[tuple, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self) -> None:
+        self.fragments.clear()
+
+
+class BytecodeStore(BytecodeCache):
+    """Jinja2 bytecode cache kept in memory, so it can be exported."""
+
+    def __init__(self):
+        self.entries: dict[str, bytes] = {}
+
+    def load_bytecode(self, bucket) -> None:
+        data = self.entries.get(bucket.key)
+        if data is not None:
+            # Jinja2 discards it if the template source changed
+            bucket.bytecode_from_string(data)
+
+    def dump_bytecode(self, bucket) -> None:
+        self.entries[bucket.key] = bucket.bytecode_to_string()
+
+
+class BuildCache:
+    """Warm state that can be reused between builds in the same process.
+
+    A one-shot ``slarti generate`` starts from an empty cache; the build
+    daemon keeps one alive so repeated builds skip template compilation,
+    re-reading unchanged content files and re-rendering unchanged Markdown.
+
+    - ``environments``: Jinja2 environments keyed by theme search path.
+    - ``content_index``: parsed front matter and body per content file,
+      validated against the file's mtime and size.
+    - ``rendered``: rendered documents (HTML plus table of contents, excerpt
+      and reading time) keyed by the digest of their Markdown source.
+    - ``derived``: the latest value of site-wide computations (e.g. related
+      posts) per site, reused while their inputs' signature is unchanged.
+    - ``bytecode``: compiled templates, so new environments (e.g. after
+      importing a cache archive) skip compilation.
+    - ``image_sizes``: image dimensions per file, validated against the
+      file's mtime and size.
+    - ``fragments``: template blocks rendered by ``{% cache %}``; unlike the
+      rest, these only live for a single build.
+    """
+
+    def __init__(self):
+        self.environments: dict[tuple, object] = {}
+        self.content_index: dict[str, dict] = {}
+        self.rendered: dict[str, dict] = {}
+        self.derived: dict[tuple[str, str], tuple[str, object]] = {}
+        self.image_sizes: dict[str, tuple] = {}
+        self.bytecode = BytecodeStore()
+        self.fragments = FragmentStore()
+        self.hits = 0
+        self.misses = 0
+        self._seen_files: set[str] = set()
+        self._root = ""
+
+    def environment(self, key: tuple, factory: Callable[[], object]):
+        """Return the cached environment for ``key``, creating it if needed."""
+        env = self.environments.get(key)
+        if env is None:
+            env = self.environments[key] = factory()
+        return env
+
+    def read_page(
+        self, filepath: str, parse: Callable[[str], tuple[dict, str]]
+    ) -> tuple[dict, str]:
+        """Return ``parse(text)`` for a content file, reusing unchanged entries.
+
+        The front matter is a copy, so a build (or a plugin) changing a page's
+        config doesn't change what the next build reads from the cache."""
+        key = os.path.abspath(filepath)
+        stat = os.stat(key)
+        entry = self.content_index.get(key)
+        if (
+            entry is None
+            or entry["mtime_ns"] != stat.st_mtime_ns
+            or entry["size"] != stat.st_size
+        ):
+            with open(key, "r") as file:
+                text = file.read()
+            page_config, content = parse(text)
+            entry = self.content_index[key] = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "source_digest": content_digest(text),
+                "config": page_config,
+                "content": content,
+                "digest": content_digest(content),
+            }
+        self._seen_files.add(key)
+        return deepcopy(entry["config"]), entry["content"]
+
+    def render(self, content: str, renderer: Callable[[str], dict]) -> dict:
+        """Return ``renderer(content)``, reusing the result for unchanged input."""
+        digest = content_digest(content)
+        document = self.rendered.get(digest)
+        if document is None:
+            self.misses += 1
+            document = self.rendered[digest] = renderer(content)
+        else:
+            self.hits += 1
+        return document
+
+    def memoize(self, name: str, signature: str, factory: Callable[[], object]):
+        """Return the value stored under ``name`` if it was computed for
+        ``signature``; otherwise compute it with ``factory`` and store it.
+
+        Values are kept per site (the root passed to ``begin_build()``), so
+        building several sites with one cache doesn't evict each other's."""
+        key = (self._root, name)
+        cached = self.derived.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        value = factory()
+        self.derived[key] = (signature, value)
+        return value
+
+    def begin_build(self, root: str = "") -> None:
+        """Start tracking which content files the next build of `root` reads."""
+        self._root = os.path.abspath(root) if root else ""
+        self._seen_files = set()
+        self.fragments.clear()
+
+    def end_build(self, root: str) -> None:
+        """Drop entries for files under ``root`` the last build didn't read.
+
+        Rendered documents are kept only while some indexed file still has that
+        content, so a long-lived process doesn't grow without bound.
+        """
+        prefix = os.path.join(os.path.abspath(root), "")
+        for key in list(self.content_index):
+            if key.startswith(prefix) and key not in self._seen_files:
+                del self.content_index[key]
+        live = {entry["digest"] for entry in self.content_index.values()}
+        for digest in list(self.rendered):
+            if digest not in live:
+                del self.rendered[digest]
+
+
+def load_manifest(output: str) -> dict:
+    """Load the manifest written by the previous build into `output`.
+
+    The manifest maps each generated page to the fingerprint of its inputs
+    and the template files it was rendered with. A missing, unreadable or
+    outdated manifest yields an empty one, i.e. a full build; malformed page
+    entries are dropped, so those pages are rebuilt.
+    """
+    empty = {"version": MANIFEST_VERSION, "pages": {}}
+    try:
+        with open(os.path.join(output, config.MANIFEST_FILENAME), "r") as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return empty
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return empty
+    pages = manifest.get("pages")
+    manifest["pages"] = {
+        name: entry
+        for name, entry in (pages.items() if isinstance(pages, dict) else ())
+        if isinstance(entry, dict)
+        and isinstance(entry.get("fingerprint"), str)
+        and isinstance(entry.get("templates"), list)
+    }
+    return manifest
+
+
+def save_manifest(output: str, manifest: dict) -> None:
+    """Write the build manifest into `output`."""
+    with open(os.path.join(output, config.MANIFEST_FILENAME), "w") as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+
+
+class CacheArchiveError(Exception):
+    """Raised when a cache archive can't be used."""
+
+
+def _encode_value(value):
+    # Front matter may hold dates, which JSON has no type for
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"$date": value.isoformat()}
+    raise TypeError(f"Cannot archive {type(value).__name__} values")
+
+
+def _decode_value(obj: dict):
+    if "$datetime" in obj:
+        return datetime.fromisoformat(obj["$datetime"])
+    if "$date" in obj:
+        return date.fromisoformat(obj["$date"])
+    return obj
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def export_archive(
+    cache: BuildCache,
+    archive: str,
+    root: str,
+    output: str | None = None,
+    bytecode: bool = False,
+) -> dict:
+    """Pack the cache state for the site at `root` into a gzipped tarball.
+
+    The archive holds the content index (keyed by paths relative to `root`),
+    the rendered documents those files use, the output manifest of `output`,
+    if given, and with `bytecode` the compiled templates. An ``index.json``
+    member records the format version and a SHA-256 hash of every other
+    member. Returns the number of entries of each kind.
+    """
+    root = os.path.abspath(root)
+    prefix = os.path.join(root, "")
+    content = {}
+    for key, entry in cache.content_index.items():
+        if not key.startswith(prefix):
+            continue
+        try:
+            json.dumps(entry["config"], default=_encode_value)
+        except (TypeError, ValueError):
+            continue
+        content[os.path.relpath(key, root)] = {
+            name: entry[name]
+            for name in ("source_digest", "config", "content", "digest")
+        }
+    digests = {entry["digest"] for entry in content.values()}
+    rendered = {
+        digest: document
+        for digest, document in cache.rendered.items()
+        if digest in digests
+    }
+
+    members = {
+        "content.json": json.dumps(content, default=_encode_value, sort_keys=True),
+        "rendered.json": json.dumps(rendered, sort_keys=True),
+    }
+    members = {name: data.encode("utf-8") for name, data in members.items()}
+    if output is not None:
+        manifest_file = os.path.join(output, config.MANIFEST_FILENAME)
+        if os.path.isfile(manifest_file):
+            with open(manifest_file, "rb") as file:
+                members["manifest.json"] = file.read()
+    templates = sorted(cache.bytecode.entries.items()) if bytecode else []
+    for key, data in templates:
+        members[f"bytecode/{key}"] = data
+
+    index = {
+        "version": ARCHIVE_VERSION,
+        "slartibartfast": __version__,
+        "members": {name: _sha256(data) for name, data in members.items()},
+    }
+    members = {"index.json": json.dumps(index, indent=1).encode("utf-8"), **members}
+    with tarfile.open(archive, "w:gz") as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return {
+        "content": len(content),
+        "rendered": len(rendered),
+        "templates": len(templates),
+    }
+
+
+def _read_archive(archive: str) -> dict[str, bytes]:
+    """Return the members of a cache archive after checking their hashes."""
+    try:
+        with tarfile.open(archive, "r:gz") as tar:
+            members = {
+                info.name: tar.extractfile(info).read()
+                for info in tar.getmembers()
+                if info.isfile()
+            }
+        index = json.loads(members.pop("index.json"))
+    except (OSError, KeyError, ValueError, tarfile.TarError) as e:
+        raise CacheArchiveError(f"Unreadable cache archive {archive}: {e}") from e
+    if index.get("version") != ARCHIVE_VERSION:
+        raise CacheArchiveError(
+            f"Unsupported cache archive version {index.get('version')}"
+        )
+    if index.get("slartibartfast") != __version__:
+        raise CacheArchiveError(
+            f"Cache archive was made by slartibartfast {index.get('slartibartfast')}"
+        )
+    if set(members) != set(index["members"]):
+        raise CacheArchiveError("Cache archive members don't match its index")
+    for name, data in members.items():
+        if _sha256(data) != index["members"][name]:
+            raise CacheArchiveError(f"Cache archive member {name} is corrupt")
+    return members
+
+
+def import_archive(
+    cache: BuildCache,
+    archive: str,
+    root: str,
+    output: str | None = None,
+    trust_bytecode: bool = False,
+) -> dict:
+    """Load a cache archive made by `export_archive` for the site at `root`.
+
+    The whole archive is rejected with CacheArchiveError if it is corrupt or
+    from another version. Otherwise content entries are kept only for files
+    under `root` whose current contents match the archived hash, rendered
+    documents only for kept content, and template bytecode only with
+    `trust_bytecode` and if it was compiled by this Python version. The
+    manifest is restored into `output` unless it already has one. Returns
+    the number of entries kept and discarded.
+
+    The hashes only detect corruption: anyone who can write the archive can
+    change them too. Bytecode is executed when templates render, so only
+    trust it in archives from a trusted source.
+    """
+    members = _read_archive(archive)
+    root = os.path.abspath(root)
+    counts = {"content": 0, "stale": 0, "rendered": 0, "templates": 0}
+
+    content = json.loads(members["content.json"], object_hook=_decode_value)
+    for relative, entry in content.items():
+        path = os.path.join(root, relative)
+        try:
+            stat = os.stat(path)
+            with open(path, "r") as file:
+                current = content_digest(file.read())
+        except (OSError, UnicodeDecodeError):
+            current = None
+        if current != entry["source_digest"]:
+            counts["stale"] += 1
+            continue
+        cache.content_index[path] = dict(
+            entry, mtime_ns=stat.st_mtime_ns, size=stat.st_size
+        )
+        counts["content"] += 1
+
+    live = {entry["digest"] for entry in cache.content_index.values()}
+    for digest, document in json.loads(members["rendered.json"]).items():
+        if digest in live:
+            cache.rendered[digest] = document
+            counts["rendered"] += 1
+
+    for name, data in members.items() if trust_bytecode else ():
+        if name.startswith("bytecode/") and data.startswith(bc_magic):
+            cache.bytecode.entries[name.removeprefix("bytecode/")] = data
+            counts["templates"] += 1
+
+    if output is not None and "manifest.json" in members:
+        manifest_file = os.path.join(output, config.MANIFEST_FILENAME)
+        if not os.path.exists(manifest_file):
+            os.makedirs(output, exist_ok=True)
+            with open(manifest_file, "wb") as file:
+                file.write(members["manifest.json"])
+    return counts
+
+
+# Process-wide cache used when callers don't pass their own.
+default_cache = BuildCache()
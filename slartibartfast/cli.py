@@ -1,7 +1,11 @@
+import os
+
 import typer
 
-from . import config, server
-from .generator import generate_site
+# Keep this module light: `slarti --help` and every subcommand pay for what is
+# imported here. Heavy dependencies (Jinja2, markdown-it, watchdog) are
+# imported inside the commands that need them.
+from . import config
 
 app = typer.Typer(
     help="Slartibartfast: A tiny, fast static site generator.",
@@ -9,27 +13,235 @@ app = typer.Typer(
 )
 
 
+def _report(stats: dict) -> None:
+    message = (
+        f"Site generation complete: {stats['pages']} pages rendered, "
+        f"{stats.get('unchanged', 0)} unchanged"
+    )
+    if stats.get("static_dirs", 0) > 0:
+        message += f", {stats['static_dirs']} static directories copied"
+    if stats.get("theme_assets", 0) > 0:
+        message += f", {stats['theme_assets']} theme assets copied"
+    if stats.get("feeds", 0) > 0:
+        message += f", {stats['feeds']} feeds updated"
+    if stats.get("broken_links", 0) > 0:
+        message += f", {stats['broken_links']} broken links"
+    message += f", {stats['errors']} errors."
+
+    typer.echo(message)
+    hooks = stats.get("hooks", {})
+    for hook, timing in sorted(hooks.items(), key=lambda item: -item[1]["seconds"]):
+        typer.echo(
+            f"  {hook}: {timing['calls']} calls, {timing['seconds'] * 1000:.1f} ms"
+        )
+
+
 @app.command("generate")
 def generate_cmd(
     path: str = typer.Argument(..., help="Path to the site content"),
     output: str = typer.Option(
         default=config.DEFAULT_OUTPUT_DIR,
-        help="Output directory for the generated site",
+        help="Output directory, or an archive (.tar, .tar.gz, .tar.zst, .zip)",
+    ),
+    since: str = typer.Option(
+        None,
+        help="Previous archive or manifest; only write files changed since it",
+    ),
+    only: list[str] = typer.Option(
+        None,
+        help="Only build pages under this path or matching this glob "
+        "(e.g. blog/), and their section index; repeatable",
+    ),
+    use_daemon: bool = typer.Option(
+        True,
+        "--daemon/--no-daemon",
+        help="Send the build to a running `slarti daemon` if there is one "
+        "(directory outputs only)",
     ),
 ):
     """Generate the static site."""
     typer.echo(f"Generating static site from {path} to {output}...")
-    stats = generate_site(path, output)
+    # Archives are built here: their timestamps come from this process's
+    # $SOURCE_DATE_EPOCH, not the daemon's.
+    archive = output.endswith(tuple(config.ARCHIVE_SUFFIXES))
+    if use_daemon and since is None and not archive:
+        from . import daemon
+
+        try:
+            response = daemon.generate(path, output, only=only or None)
+        except daemon.DaemonError as e:
+            typer.echo(f"Error: {e}")
+            raise typer.Exit(code=1)
+        if response is not None:
+            typer.echo(response["log"], nl=False)
+            _report(response["stats"])
+            return
+
+    from .generator import generate_site, select_paths
+    from .output import ArchiveOutput, open_output
+
+    try:
+        writer = open_output(output, since)
+    except (OSError, ValueError, KeyError, RuntimeError) as e:
+        typer.echo(f"Error: {e}")
+        raise typer.Exit(code=1)
+    with writer:
+        stats = generate_site(path, writer, only=select_paths(only) if only else None)
     # typer.echo(f"Loaded configuration: {config}")
+    _report(stats)
+    if isinstance(writer, ArchiveOutput):
+        typer.echo(f"Wrote {writer.written} files to {output}.")
 
-    message = f"Site generation complete: {stats['pages']} pages created"
-    if stats.get("static_dirs", 0) > 0:
-        message += f", {stats['static_dirs']} static directories copied"
-    if stats.get("theme_assets", 0) > 0:
-        message += f", {stats['theme_assets']} theme assets copied"
-    message += f", {stats['errors']} errors."
 
-    typer.echo(message)
+@app.command("generate-many")
+def generate_many_cmd(
+    sites: list[str] = typer.Argument(
+        ..., help="Site roots or glob patterns (e.g. 'sites/*')"
+    ),
+    output: str = typer.Option(
+        default=config.DEFAULT_OUTPUT_DIR,
+        help="Directory to build each site into, as <output>/<site name>",
+    ),
+    workers: int = typer.Option(
+        1, help="Worker processes; sites sharing a theme share a worker's cache"
+    ),
+):
+    """Generate several sites in one warm process or a worker pool."""
+    import time
+
+    from . import batch
+
+    roots = batch.find_sites(sites)
+    if not roots:
+        typer.echo("Error: no site roots (directories with _config.yaml) found")
+        raise typer.Exit(code=1)
+
+    typer.echo(f"Generating {len(roots)} sites into {output}...")
+    start = time.perf_counter()
+    try:
+        results = batch.build_sites(roots, output, workers=workers)
+    except ValueError as e:
+        typer.echo(f"Error: {e}")
+        raise typer.Exit(code=1)
+    summary = batch.summarize(results, time.perf_counter() - start)
+
+    for result in results:
+        stats = result["stats"]
+        if result["error"]:
+            typer.echo(f"{result['site']}: failed: {result['error']}")
+        else:
+            typer.echo(
+                f"{result['site']}: {stats['pages']} pages rendered, "
+                f"{stats.get('unchanged', 0)} unchanged, {stats['errors']} errors "
+                f"in {result['seconds']:.2f}s"
+            )
+        # The build log names the pages that failed and why
+        if result["error"] or stats["errors"]:
+            for line in result["log"].splitlines():
+                typer.echo(f"  {line}")
+    typer.echo(
+        f"Built {summary['sites'] - summary['failed']}/{summary['sites']} sites: "
+        f"{summary['pages']} pages in {summary['seconds']:.2f}s "
+        f"({summary['pages_per_second']:.1f} pages/s), {summary['errors']} errors."
+    )
+    if summary["failed"]:
+        raise typer.Exit(code=1)
+
+
+cache_app = typer.Typer(help="Save and restore the build cache (e.g. on CI).")
+app.add_typer(cache_app, name="cache")
+
+
+@cache_app.command("export")
+def cache_export_cmd(
+    path: str = typer.Argument(..., help="Path to the site content"),
+    archive: str = typer.Argument(..., help="Cache archive to write (.tar.gz)"),
+    output: str = typer.Option(
+        default=config.DEFAULT_OUTPUT_DIR,
+        help="Output directory for the generated site",
+    ),
+    bytecode: bool = typer.Option(
+        False,
+        "--bytecode",
+        help="Include compiled templates; importing them runs their code",
+    ),
+):
+    """Build the site (incrementally) and export the warm cache to an archive."""
+    from .cache import BuildCache, export_archive
+    from .generator import generate_site
+
+    cache = BuildCache()
+    stats = generate_site(path, output, cache=cache)
+    _report(stats)
+    counts = export_archive(cache, archive, path, output, bytecode=bytecode)
+    typer.echo(
+        f"Exported {counts['content']} content files, {counts['rendered']} "
+        f"rendered documents and {counts['templates']} templates to {archive}."
+    )
+
+
+@cache_app.command("import")
+def cache_import_cmd(
+    archive: str = typer.Argument(..., help="Cache archive made by `cache export`"),
+    path: str = typer.Argument(..., help="Path to the site content"),
+    output: str = typer.Option(
+        default=config.DEFAULT_OUTPUT_DIR,
+        help="Output directory for the generated site",
+    ),
+    trust_bytecode: bool = typer.Option(
+        False,
+        "--trust-bytecode",
+        help="Load compiled templates from the archive. They run as code, so "
+        "only use this with archives from a trusted source",
+    ),
+):
+    """Restore a cache archive, checked against the site, and build with it.
+
+    An unusable archive (missing, corrupt or from another version) is
+    reported and the site is built from scratch. The archive's hashes only
+    catch corruption, not tampering.
+    """
+    from .cache import BuildCache, CacheArchiveError, import_archive
+    from .generator import generate_site
+
+    cache = BuildCache()
+    try:
+        counts = import_archive(
+            cache, archive, path, output, trust_bytecode=trust_bytecode
+        )
+    except CacheArchiveError as e:
+        typer.echo(f"Ignoring cache archive: {e}")
+    else:
+        typer.echo(
+            f"Imported {counts['content']} content files ({counts['stale']} stale "
+            f"discarded), {counts['rendered']} rendered documents and "
+            f"{counts['templates']} templates."
+        )
+    stats = generate_site(path, output, cache=cache)
+    _report(stats)
+
+
+@app.command("check-links")
+def check_links_cmd(
+    output: str = typer.Argument(
+        config.DEFAULT_OUTPUT_DIR, help="Directory the site was built into"
+    ),
+):
+    """Report internal links and anchors that point nowhere."""
+    from .links import check_links
+
+    if not os.path.isdir(output):
+        typer.echo(f"Error: '{output}' is not a directory")
+        raise typer.Exit(code=1)
+    broken = check_links(output)
+    for link in broken:
+        typer.echo(
+            f"{link['source']}:{link['line']}: {link['target']} ({link['reason']})"
+        )
+    if broken:
+        typer.echo(f"{len(broken)} broken links.")
+        raise typer.Exit(code=1)
+    typer.echo("No broken links.")
 
 
 @app.command("serve")
@@ -42,8 +254,34 @@ def serve_cmd(
     port: int = 8000,
 ):
     """Serve the static site locally on port 8000."""
+    from . import server
+
     server.serve(path, output, port)
 
 
+@app.command("daemon")
+def daemon_cmd(
+    socket_path: str = typer.Option(
+        None,
+        "--socket",
+        help="Unix socket to listen on (default: $SLARTI_SOCKET or a temp path)",
+    ),
+):
+    """Run a warm build daemon that `slarti generate` will use."""
+    from . import daemon
+
+    try:
+        server = daemon.create_server(socket_path)
+    except daemon.DaemonError as e:
+        typer.echo(f"Error: {e}")
+        raise typer.Exit(code=1)
+    typer.echo(f"Build daemon listening on {server.socket_path}")
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            typer.echo("Shutting down build daemon...")
+
+
 if __name__ == "__main__":
     app()
@@ -4,3 +4,12 @@ DEFAULT_THEME = "default"
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 THEMES_DIR = os.path.join(BASE_DIR, "themes")
 DEFAULT_OUTPUT_DIR = "_build"
+MANIFEST_FILENAME = ".slarti-manifest.json"
+# Output names that are built as archives, and their formats
+ARCHIVE_SUFFIXES = {
+    ".tar": "tar",
+    ".tar.gz": "gztar",
+    ".tgz": "gztar",
+    ".tar.zst": "zstdtar",
+    ".zip": "zip",
+}
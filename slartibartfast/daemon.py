@@ -0,0 +1,208 @@
+"""Warm build daemon and its client.
+
+`slarti daemon` keeps a process alive behind a Unix socket, holding the
+template environments, Markdown parser and content/render caches between
+builds. `slarti generate` sends its build to the daemon when one is
+listening and falls back to building in-process otherwise.
+
+The protocol is one JSON object per line in each direction.
+"""
+
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+import time
+
+SOCKET_ENV_VAR = "SLARTI_SOCKET"
+
+# Unix sockets aren't available everywhere (e.g. Windows). There the client
+# never finds a daemon and create_server() refuses to start one.
+_UnixStreamServer = getattr(socketserver, "UnixStreamServer", socketserver.TCPServer)
+
+
+class DaemonError(Exception):
+    """Raised when the daemon reports a failed request."""
+
+
+def _private_directory(create: bool = False) -> str:
+    """Return $XDG_RUNTIME_DIR, or a temp directory only this user can use.
+
+    The temp directory is only made if `create` is set; clients just look
+    for a socket in it.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return runtime_dir
+    directory = os.path.join(tempfile.gettempdir(), f"slarti-{os.getuid()}")
+    if create:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    elif not os.path.lexists(directory):
+        return directory
+    info = os.lstat(directory)
+    if (
+        not stat.S_ISDIR(info.st_mode)
+        or info.st_uid != os.getuid()
+        or info.st_mode & 0o077
+    ):
+        raise DaemonError(f"{directory} is not a private directory of this user")
+    return directory
+
+
+def default_socket_path(create: bool = False) -> str:
+    """Return the socket path from $SLARTI_SOCKET or a per-user private path.
+
+    `create` makes the private directory if it doesn't exist yet.
+    """
+    return os.environ.get(SOCKET_ENV_VAR) or os.path.join(
+        _private_directory(create), "slarti.sock"
+    )
+
+
+def _check_owner(socket_path: str) -> None:
+    # Anyone could have created the socket; only talk to our own daemon.
+    if os.stat(socket_path).st_uid != os.getuid():
+        raise DaemonError(f"{socket_path} belongs to another user")
+
+
+def request(message: dict, socket_path: str | None = None) -> dict:
+    """Send one request to the daemon and return its response.
+
+    Raises DaemonError if the socket is owned by another user.
+    """
+    socket_path = socket_path or default_socket_path()
+    _check_owner(socket_path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as reader:
+            line = reader.readline()
+    if not line:
+        raise DaemonError("Daemon closed the connection without a response")
+    response = json.loads(line)
+    if not response.get("ok"):
+        raise DaemonError(response.get("error", "Unknown daemon error"))
+    return response
+
+
+def generate(
+    path: str,
+    output: str,
+    socket_path: str | None = None,
+    only: list[str] | None = None,
+) -> dict | None:
+    """Build a site on the running daemon.
+
+    `only` restricts the build to pages matching those path patterns (see
+    `generator.select_paths`). `output` must be a directory: archives take
+    their timestamps from this process's environment ($SOURCE_DATE_EPOCH),
+    which the daemon doesn't share. Returns the daemon's response (with ``stats``
+    and the build ``log``), or None when no daemon is listening so the caller
+    can build in-process.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    socket_path = socket_path or default_socket_path()
+    if not os.path.exists(socket_path):
+        return None
+    message = {
+        "command": "generate",
+        "path": os.path.abspath(path),
+        "output": os.path.abspath(output),
+    }
+    if only:
+        message["only"] = list(only)
+    try:
+        return request(message, socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        return None
+
+
+class _BuildRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            response = self.server.dispatch(json.loads(self.rfile.readline()))
+        except Exception as e:
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+class BuildDaemon(_UnixStreamServer):
+    """Unix socket server that runs builds against a long-lived BuildCache."""
+
+    def __init__(self, socket_path: str):
+        from .cache import BuildCache
+        from .generator import get_markdown
+
+        self.socket_path = socket_path
+        super().__init__(socket_path, _BuildRequestHandler)
+        self.cache = BuildCache()
+        self.builds = 0
+        # Warm up the parser now rather than on the first build
+        get_markdown()
+
+    def dispatch(self, message: dict) -> dict:
+        command = message.get("command")
+        if command == "ping":
+            return {"ok": True, "pid": os.getpid(), "builds": self.builds}
+        if command == "generate":
+            return self._generate(
+                message["path"], message["output"], message.get("only")
+            )
+        if command == "shutdown":
+            # shutdown() blocks until serve_forever() returns, so it can't be
+            # called from the serving thread itself.
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"ok": True}
+        return {"ok": False, "error": f"Unknown command: {command}"}
+
+    def _generate(self, path: str, output: str, only: list[str] | None) -> dict:
+        from .generator import generate_site, select_paths
+
+        log = io.StringIO()
+        start = time.perf_counter()
+        # Requests are handled one at a time, so redirecting stdout only ever
+        # captures this build's output.
+        with contextlib.redirect_stdout(log):
+            stats = generate_site(
+                path,
+                output,
+                cache=self.cache,
+                only=select_paths(only) if only else None,
+            )
+        self.builds += 1
+        return {
+            "ok": True,
+            "stats": stats,
+            "log": log.getvalue(),
+            "elapsed": time.perf_counter() - start,
+        }
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def create_server(socket_path: str | None = None) -> BuildDaemon:
+    """Create a daemon bound to `socket_path`.
+
+    A stale socket file left behind by a dead daemon is replaced; a live
+    daemon on the same socket raises DaemonError.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        raise DaemonError("The build daemon needs Unix domain sockets")
+    socket_path = socket_path or default_socket_path(create=True)
+    if os.path.exists(socket_path):
+        try:
+            request({"command": "ping"}, socket_path)
+        except (DaemonError, OSError):
+            os.unlink(socket_path)
+        else:
+            raise DaemonError(f"A daemon is already listening on {socket_path}")
+    return BuildDaemon(socket_path)
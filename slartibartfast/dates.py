@@ -0,0 +1,124 @@
+"""Dates for pages whose front matter doesn't set one.
+
+A page without a `date` gets the date of the last git commit that touched
+its source file or, outside git (or for files git doesn't track), the
+file's modification time. Either way the same inputs give the same date,
+unlike the day of the build. Dates are cached in the build cache's content
+index next to the parsed file they belong to.
+"""
+
+from datetime import datetime, timezone
+import os
+import posixpath
+import subprocess
+
+from .cache import BuildCache, default_cache
+
+DATE_SOURCES = ("auto", "git", "mtime")
+
+
+def mtime_date(filepath: str) -> str:
+    """Return the UTC date a file was last modified on, as ISO 8601."""
+    timestamp = os.stat(filepath).st_mtime
+    return datetime.fromtimestamp(timestamp, timezone.utc).date().isoformat()
+
+
+def _git(root: str, *args: str) -> subprocess.Popen:
+    return subprocess.Popen(
+        ["git", "-C", root, *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+
+
+def git_head(root: str) -> tuple[str, str] | None:
+    """Return the work tree's top-level directory and HEAD commit, if any."""
+    try:
+        process = _git(root, "rev-parse", "--show-toplevel", "HEAD")
+    except OSError:
+        return None
+    output, _ = process.communicate()
+    lines = output.split()
+    if process.returncode != 0 or len(lines) != 2:
+        return None
+    return lines[0], lines[1]
+
+
+def git_dates(top: str, filepaths: list[str]) -> dict[str, str]:
+    """Return the date of the last commit touching each file, in one pass.
+
+    Walks ``git log`` newest first, limited to the directory holding the
+    files, and stops as soon as every file has been seen. Files that were
+    never committed are left out; an uncommitted file makes the walk read
+    that directory's whole history, but not the rest of the repository's.
+    """
+    wanted = {
+        os.path.relpath(os.path.realpath(filepath), top).replace(os.sep, "/"): filepath
+        for filepath in filepaths
+    }
+    inside = [name for name in wanted if not name.startswith("../")]
+    dates = {}
+    if not inside:
+        return dates
+    pathspec = posixpath.commonpath([posixpath.dirname(name) for name in inside])
+    try:
+        process = _git(
+            top,
+            "log",
+            "--format=%x00%cI",
+            "--name-only",
+            "--no-renames",
+            "--",
+            pathspec or ".",
+        )
+    except OSError:
+        return dates
+    commit_date = None
+    with process:
+        for line in process.stdout:
+            line = line.rstrip("\n")
+            if line.startswith("\0"):
+                commit_date = line[1:11]
+            elif line in wanted and wanted[line] not in dates:
+                dates[wanted[line]] = commit_date
+                if len(dates) == len(wanted):
+                    process.kill()
+                    break
+    return dates
+
+
+def source_dates(
+    filepaths: list[str], cache: BuildCache | None = None, source: str = "auto"
+) -> dict[str, str]:
+    """Return an ISO date for each content file, from git or its mtime.
+
+    `source` is "git", "mtime" or "auto" (git when the files are in a git
+    work tree). Git dates are cached per HEAD commit, so a new commit is
+    picked up even for files that didn't change on disk.
+    """
+    if source not in DATE_SOURCES:
+        raise ValueError(f"Unknown date_source {source!r}, use one of {DATE_SOURCES}")
+    cache = cache or default_cache
+    head = None
+    if source != "mtime" and filepaths:
+        head = git_head(os.path.dirname(os.path.abspath(filepaths[0])))
+    key = f"git:{head[1]}" if head else "mtime"
+
+    dates = {}
+    missing = []
+    for filepath in filepaths:
+        entry = cache.content_index.get(os.path.abspath(filepath), {})
+        if entry.get("date_key") == key:
+            dates[filepath] = entry["source_date"]
+        else:
+            missing.append(filepath)
+
+    if missing:
+        found = git_dates(head[0], missing) if head else {}
+        for filepath in missing:
+            dates[filepath] = found.get(filepath) or mtime_date(filepath)
+            entry = cache.content_index.get(os.path.abspath(filepath))
+            if entry is not None:
+                entry.update(source_date=dates[filepath], date_key=key)
+    return dates
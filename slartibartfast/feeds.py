@@ -0,0 +1,176 @@
+from datetime import date, datetime, timezone
+from email.utils import format_datetime
+import heapq
+import os
+from xml.sax.saxutils import escape
+
+from .output import as_writer
+
+DEFAULT_FEED_LIMIT = 20
+_EPOCH = datetime.min.replace(tzinfo=timezone.utc)
+_UNIX_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _entry_datetime(page: dict) -> datetime | None:
+    """Return the publication datetime of a page as an aware UTC datetime."""
+    value = page.get("publish_date") or page.get("date")
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+    return None
+
+
+def _is_entry(page: dict, rendered: bool = True) -> bool:
+    """Only rendered content pages become feed entries, not listings.
+
+    Of those, section posts and pages with a front-matter ``date`` are
+    entries; top-level pages such as the home or about page are not, as
+    their date is only the file's. ``feed: true`` or ``feed: false`` in the
+    front matter overrides this.
+    """
+    if ("html" not in page and rendered) or "pages" in page or "taxonomy" in page:
+        return False
+    front_matter = page.get("config") or {}
+    if "feed" in front_matter:
+        return bool(front_matter["feed"])
+    return "/" in page.get("filename", "") or "date" in front_matter
+
+
+def select_latest(
+    pages: list[dict], limit: int = DEFAULT_FEED_LIMIT, rendered: bool = True
+) -> list[dict]:
+    """Select the ``limit`` newest entries, newest first.
+
+    Uses a bounded heap, so the cost is O(n log limit) rather than a full
+    sort over every page. Pages without a usable date sort last. With
+    `rendered` false, pages count as entries whether or not they have HTML.
+    """
+    candidates = (page for page in pages if _is_entry(page, rendered))
+    return heapq.nlargest(
+        limit,
+        candidates,
+        key=lambda page: (_entry_datetime(page) or _EPOCH, page["url"]),
+    )
+
+
+def generate_atom_feed(
+    entries: list[dict], config: dict, feed_url: str, title: str | None = None
+) -> str:
+    """Generate an Atom feed from already rendered entries."""
+    base_url = config.get("base_url", "").rstrip("/")
+    title = title or config.get("title", "")
+    dates = [_entry_datetime(page) for page in entries]
+    updated = max((d for d in dates if d), default=_UNIX_EPOCH)
+
+    items = []
+    for page, published in zip(entries, dates):
+        url = base_url + page["url"]
+        published = published or updated
+        items.append(f"""
+    <entry>
+        <title>{escape(str(page["title"]))}</title>
+        <link href="{escape(url)}"/>
+        <id>{escape(url)}</id>
+        <updated>{published.isoformat()}</updated>
+        <summary>{escape(str(page.get("description", "")))}</summary>
+        <content type="html">{escape(page["html"])}</content>
+    </entry>""")
+
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+    <title>{escape(str(title))}</title>
+    <link href="{escape(base_url + feed_url)}" rel="self"/>
+    <link href="{escape(base_url + "/")}"/>
+    <id>{escape(base_url + feed_url)}</id>
+    <updated>{updated.isoformat()}</updated>{"".join(items)}
+</feed>"""
+
+
+def generate_rss_feed(
+    entries: list[dict], config: dict, feed_url: str, title: str | None = None
+) -> str:
+    """Generate an RSS 2.0 feed from already rendered entries."""
+    base_url = config.get("base_url", "").rstrip("/")
+    title = title or config.get("title", "")
+    description = escape(str(config.get("description", "")))
+
+    items = []
+    for page in entries:
+        url = base_url + page["url"]
+        published = _entry_datetime(page)
+        pub_date = (
+            f"\n            <pubDate>{format_datetime(published)}</pubDate>"
+            if published
+            else ""
+        )
+        items.append(f"""
+        <item>
+            <title>{escape(str(page["title"]))}</title>
+            <link>{escape(url)}</link>
+            <guid>{escape(url)}</guid>{pub_date}
+            <description>{escape(page["html"])}</description>
+        </item>""")
+
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0">
+    <channel>
+        <title>{escape(str(title))}</title>
+        <link>{escape(base_url + "/")}</link>
+        <description>{description}</description>{"".join(items)}
+    </channel>
+</rss>"""
+
+
+def _feeds(pages_metadata: list[dict], config: dict) -> list[tuple]:
+    """Return the URL prefix, title and pages of the site feed and each
+    section's feed."""
+    feeds = [("", config.get("title"), pages_metadata)]
+    for page in pages_metadata:
+        if "pages" in page and "taxonomy" not in page:
+            section_dir = os.path.dirname(page["filename"])
+            feeds.append((f"/{section_dir}", page["title"], page["pages"]))
+    return feeds
+
+
+def feed_candidates(pages_metadata: list[dict], config: dict) -> set[str]:
+    """Return the filenames of the pages the feeds show, rendered or not.
+
+    A partial build only renders Markdown for these and the pages it builds.
+    """
+    limit = int(config.get("feed_limit", DEFAULT_FEED_LIMIT))
+    return {
+        page["filename"]
+        for _, _, pages in _feeds(pages_metadata, config)
+        for page in select_latest(pages, limit, rendered=False)
+    }
+
+
+def generate_feeds(pages_metadata: list[dict], config: dict, output) -> int:
+    """Write site-wide and per-section Atom/RSS feeds.
+
+    The site feeds live at ``/feed.xml`` (Atom) and ``/rss.xml``; each section
+    gets the same pair next to its ``index.html``. `output` is a directory or
+    an output writer. Feeds are deterministic for a given top-N selection, so
+    a feed whose entries didn't change is left untouched (mtime included).
+    Returns the number of feed files that were (re)written.
+    """
+    writer = as_writer(output)
+    limit = int(config.get("feed_limit", DEFAULT_FEED_LIMIT))
+    written = 0
+    for prefix, title, pages in _feeds(pages_metadata, config):
+        entries = select_latest(pages, limit)
+        for filename, generate in (
+            ("feed.xml", generate_atom_feed),
+            ("rss.xml", generate_rss_feed),
+        ):
+            feed_url = f"{prefix}/{filename}"
+            content = generate(entries, config, feed_url, title)
+            if writer.write(feed_url.lstrip("/"), content, only_if_changed=True):
+                written += 1
+    return written
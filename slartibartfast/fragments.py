@@ -0,0 +1,62 @@
+import json
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+from .cache import FragmentStore, content_digest
+
+
+class FragmentCacheExtension(Extension):
+    """Render a template block once per distinct key and reuse the output.
+
+    Usage::
+
+        {% cache "header", navigation %}...{% endcache %}
+
+    The first argument is the fragment's name; any further arguments are
+    dependencies, whose values become part of the key. A block therefore
+    renders again only for a new combination of dependency values (e.g. a
+    different active navigation item). Blocks are also keyed by their
+    template and line, so two blocks on different lines never share output,
+    even with the same name. Everything the block reads that is not listed
+    as a dependency must be the same for every page in a build, such as
+    ``site.pages``: fragments are cleared at the start of each build.
+
+    The store is ``environment.fragment_cache``; the generator points it at
+    the build cache's FragmentStore, which is cleared by ``begin_build()``.
+    """
+
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=FragmentStore())
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        call = self.call_method(
+            "_render_cached",
+            [nodes.Const(parser.name), nodes.Const(lineno), nodes.List(args)],
+        )
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render_cached(self, template_name, lineno, args, caller):
+        name, *dependencies = args
+        key = (
+            template_name,
+            lineno,
+            str(name),
+            content_digest(json.dumps(dependencies, default=str)),
+        )
+        store = self.environment.fragment_cache
+        fragment = store.fragments.get(key)
+        if fragment is None:
+            store.misses += 1
+            fragment = store.fragments[key] = caller()
+        else:
+            store.hits += 1
+        return fragment
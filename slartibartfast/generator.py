@@ -1,22 +1,138 @@
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
-from datetime import date
+from datetime import date, datetime
+import fnmatch
+from functools import cache
+import hashlib
+import json
 import os
-import shutil
+import re
+from typing import TYPE_CHECKING
 
-from jinja2 import Environment, FileSystemLoader, TemplateNotFound
-from markdown_it import MarkdownIt
-from mdit_py_plugins.footnote import footnote_plugin
-from mdit_py_plugins.front_matter import front_matter_plugin
+from jinja2 import (
+    Environment,
+    FileSystemLoader,
+    TemplateNotFound,
+    meta,
+    pass_context,
+)
 import yaml
 
-from . import config
+from . import __version__, config
+from .cache import MANIFEST_VERSION, BuildCache, content_digest, default_cache
+from .dates import source_dates
+from .feeds import feed_candidates, generate_feeds
+from .fragments import FragmentCacheExtension
+from .images import add_image_attributes
+from .links import check_links
+from .output import DirectoryOutput, OutputWriter, as_writer, open_output
+from .plugins import PluginManager, plugin_signature
+from .related import DEFAULT_RELATED_LIMIT, build_section_index, related_pages
 
-md = (
-    MarkdownIt("commonmark", {"breaks": True, "html": True})
-    .use(front_matter_plugin)
-    .use(footnote_plugin)
-    .enable("table")
-)
+if TYPE_CHECKING:
+    from markdown_it import MarkdownIt
+
+
+@cache
+def get_markdown() -> "MarkdownIt":
+    """Return the shared Markdown parser, building it on first use.
+
+    markdown-it and its plugins are only imported here so that importing this
+    module (and running CLI commands that never render) stays cheap.
+    """
+    from markdown_it import MarkdownIt
+    from mdit_py_plugins.footnote import footnote_plugin
+    from mdit_py_plugins.front_matter import front_matter_plugin
+
+    return (
+        MarkdownIt("commonmark", {"breaks": True, "html": True})
+        .use(front_matter_plugin)
+        .use(footnote_plugin)
+        .enable("table")
+    )
+
+
+def __getattr__(name: str):
+    # Backwards compatibility: `generator.md` used to be a module global.
+    if name == "md":
+        return get_markdown()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+READING_WORDS_PER_MINUTE = 200
+EXCERPT_LENGTH = 200
+
+
+def _inline_text(token) -> str:
+    """Return the plain text of an inline token, without Markdown markup."""
+    parts = []
+    for child in token.children or []:
+        if child.type in ("text", "code_inline"):
+            parts.append(child.content)
+        elif child.type in ("softbreak", "hardbreak"):
+            parts.append(" ")
+    return "".join(parts)
+
+
+def _truncate(text: str, length: int) -> str:
+    """Shorten text to at most `length` characters on a word boundary."""
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(" ", 1)[0].rstrip(" ,.;:") + "…"
+
+
+def render_markdown(content: str) -> dict:
+    """Render Markdown and derive page extras from a single token pass.
+
+    The content is parsed once; the same token stream yields the HTML (with
+    `id` anchors on headings), a nested table of contents, a plain-text
+    excerpt from the first paragraph, the word count and the reading time in
+    minutes.
+    """
+    md = get_markdown()
+    env: dict = {}
+    tokens = md.parse(content, env)
+
+    toc: list[dict] = []
+    open_headings: list[dict] = []
+    used_ids: dict[str, int] = {}
+    excerpt = ""
+    words = 0
+    for index, token in enumerate(tokens):
+        if token.type == "heading_open":
+            title = _inline_text(tokens[index + 1])
+            anchor = token.attrGet("id") or slugify(title) or "section"
+            base = anchor
+            # A suffixed ID may itself be taken, e.g. by a "# A 1" heading
+            while anchor in used_ids:
+                used_ids[base] += 1
+                anchor = f"{base}-{used_ids[base]}"
+            used_ids.setdefault(anchor, 0)
+            token.attrSet("id", anchor)
+
+            heading = {
+                "level": int(token.tag[1:]),
+                "id": anchor,
+                "title": title,
+                "children": [],
+            }
+            while open_headings and open_headings[-1]["level"] >= heading["level"]:
+                open_headings.pop()
+            (open_headings[-1]["children"] if open_headings else toc).append(heading)
+            open_headings.append(heading)
+        elif token.type == "inline":
+            text = _inline_text(token)
+            words += len(text.split())
+            if not excerpt and tokens[index - 1].type == "paragraph_open":
+                excerpt = _truncate(" ".join(text.split()), EXCERPT_LENGTH)
+
+    return {
+        "html": md.renderer.render(tokens, md.options, env),
+        "toc": toc,
+        "excerpt": excerpt,
+        "word_count": words,
+        "reading_time": max(1, -(-words // READING_WORDS_PER_MINUTE)),
+    }
 
 
 def load_config(path: str) -> dict:
@@ -40,30 +156,83 @@ def _extract_config_header(content: str) -> tuple[dict, str]:
     return ({}, content)
 
 
-def should_process(config: dict) -> bool:
-    """Determine if the site should be processed based on config."""
-    published = bool(config.get("published", False))
+def _publish_date(config: dict) -> date | None:
+    value = config.get("publish_date", None)
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        # YAML parses unquoted dates
+        return value
     try:
-        publish_date = date.fromisoformat(config.get("publish_date", None))  # type: ignore
+        return date.fromisoformat(value)  # type: ignore
     except (ValueError, TypeError):
-        publish_date = None
-    return published and (publish_date is None or publish_date <= date.today())
+        return None
+
+
+def should_process(config: dict, today: date | None = None) -> bool:
+    """Determine if the site should be processed based on config."""
+    published = bool(config.get("published", False))
+    publish_date = _publish_date(config)
+    return published and (
+        publish_date is None or publish_date <= (today or date.today())
+    )
+
 
+def scheduled_date(config: dict, today: date | None = None) -> date | None:
+    """Return the future date a published page is scheduled to appear on."""
+    publish_date = _publish_date(config)
+    if config.get("published", False) and publish_date is not None:
+        if publish_date > (today or date.today()):
+            return publish_date
+    return None
 
-def template_loader(source_path: str, theme: str, template_name: str):
+
+def slugify(value) -> str:
+    """Turn a tag or title into a lowercase, URL-safe slug."""
+    slug = re.sub(r"[^\w\s-]", "", str(value).lower())
+    return re.sub(r"[\s_-]+", "-", slug).strip("-")
+
+
+def template_loader(
+    source_path: str,
+    theme: str,
+    template_name: str,
+    cache: BuildCache | None = None,
+):
     """Load a Jinja2 template from themes/<theme>/<template_name>.
 
     If template_name contains a slash (e.g. "other_theme/page.html"), the
     first path segment will be treated as the theme name and override the
     `theme` argument.
+
+    Environments are reused from `cache` (compiled templates included) as long
+    as the theme directories are unchanged; Jinja2 itself reloads individual
+    templates whose files were modified.
     """
 
     source_theme_dir = os.path.join(source_path, theme)
     theme_dir = os.path.join(config.THEMES_DIR, theme)
-    if not os.path.isdir(theme_dir) and not os.path.isdir(source_theme_dir):
+    search_path = [d for d in (source_theme_dir, theme_dir) if os.path.isdir(d)]
+    if not search_path:
         raise FileNotFoundError(f"Theme not found: {theme}")
 
-    env = Environment(loader=FileSystemLoader([source_theme_dir, theme_dir]))
+    cache = cache or default_cache
+
+    def create_environment():
+        env = Environment(
+            loader=FileSystemLoader(search_path),
+            extensions=[FragmentCacheExtension],
+            bytecode_cache=cache.bytecode,
+        )
+        env.filters["slugify"] = slugify
+        env.filters["term_slug"] = term_slug
+        env.fragment_cache = cache.fragments
+        return env
+
+    # Directory mtimes change when templates are added or removed, which
+    # would change how the search path resolves a template name.
+    key = tuple((d, os.stat(d).st_mtime_ns) for d in search_path)
+    env = cache.environment(key, create_environment)
     try:
         return env.get_template(template_name)
     except TemplateNotFound as exc:
@@ -72,20 +241,198 @@ def template_loader(source_path: str, theme: str, template_name: str):
         ) from exc
 
 
-def collect_pages_metadata(path: str, subfolder: str = "") -> list[dict]:
-    """Collect metadata from all markdown files in the path."""
+def template_dependencies(env: Environment, template_name: str) -> list[str]:
+    """Return the files of a template and of every template it depends on.
+
+    Follows `extends`, `include`, `import` and `from` references
+    transitively, resolving each name through the environment's loader so
+    site-local overrides win over `config.THEMES_DIR` exactly as they do when
+    rendering. A reference computed at render time can't be resolved
+    statically, so it makes the template depend on every template in the
+    theme.
+    """
+    files = []
+    seen = set()
+    pending = [template_name]
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        try:
+            source, filename, _ = env.loader.get_source(env, name)
+        except TemplateNotFound:
+            continue
+        files.append(filename)
+        for reference in meta.find_referenced_templates(env.parse(source)):
+            if reference is None:
+                pending.extend(env.list_templates(extensions=["html", "htm", "xml"]))
+            else:
+                pending.append(reference)
+    return sorted(files)
+
+
+def _template_key(env: Environment, filename: str) -> str:
+    """Return `filename` relative to the loader directory it was found in.
+
+    Unlike the filename itself, this doesn't depend on how the site path was
+    spelled or where the site and the package are checked out.
+    """
+    for directory in env.loader.searchpath:
+        relative = os.path.relpath(filename, directory)
+        if not relative.startswith(os.pardir + os.sep):
+            return relative.replace(os.sep, "/")
+    return filename
+
+
+def _template_signature(template, template_name: str, memo: dict) -> list:
+    """Return [name, digest] pairs for a template's dependency closure.
+
+    Files are named by `_template_key`. `memo` is scoped to one build, so
+    each template is resolved and each file hashed at most once per build.
+    """
+    if template_name not in memo:
+        env = template.environment
+        signature = []
+        for filename in template_dependencies(env, template_name):
+            if filename not in memo:
+                with open(filename, "rb") as file:
+                    memo[filename] = hashlib.sha1(file.read()).hexdigest()
+            signature.append([_template_key(env, filename), memo[filename]])
+        memo[template_name] = sorted(signature)
+    return memo[template_name]
+
+
+def _site_signature(config: dict, pages_metadata: list[dict]) -> str:
+    """Digest of everything any page can see through `site` and `navigation`.
+
+    Listings, navigation, taxonomies and related posts are all derived from
+    these fields, so a change here invalidates every page. Page bodies are
+    not part of it: editing one page's content only rebuilds that page
+    (unless its excerpt or reading time, shown in listings, changes too).
+    Neither is the site's path, so the same site gives the same digest
+    however it is spelled or wherever it is checked out.
+    """
+    return content_digest(
+        json.dumps(
+            [
+                __version__,
+                {key: value for key, value in config.items() if key != "source_path"},
+                [
+                    (
+                        page["url"],
+                        page["title"],
+                        page.get("date"),
+                        page.get("description"),
+                        page.get("nav_order"),
+                        page.get("in_nav"),
+                        page["config"],
+                        page.get("excerpt"),
+                        page.get("reading_time"),
+                    )
+                    for page in pages_metadata
+                ],
+            ],
+            default=str,
+        )
+    )
+
+
+# Content files read at once by collect_pages_metadata. Reading is I/O bound,
+# so this mostly pays off on network or otherwise high-latency storage.
+SCAN_WORKERS = 16
+
+
+def _assign_dates(
+    pages_metadata: list[dict], cache: BuildCache, date_source: str
+) -> None:
+    """Date pages without a front matter `date` from their source files.
+
+    Sections without one take the date of their newest page.
+    """
+    undated = [
+        page
+        for page in pages_metadata
+        if page["date"] is None and "source_path" in page
+    ]
+    dates = source_dates([page["source_path"] for page in undated], cache, date_source)
+    for page in undated:
+        page["date"] = dates[page["source_path"]]
+    # Nested sections come before the sections containing them
+    for section in pages_metadata:
+        if section["date"] is None and section.get("pages"):
+            dated = [page for page in section["pages"] if page["date"] is not None]
+            if dated:
+                section["date"] = max(dated, key=lambda page: str(page["date"]))["date"]
+
+
+def _scan_directory(path: str) -> list[tuple[str, str, list | None]]:
+    """List a content directory's sections and Markdown files, sorted by name.
+
+    Returns ``("section", name, items)`` entries, where `items` is the
+    section's own listing, and ``("page", name, None)`` entries. File types
+    come from `os.scandir`, so the only extra stat is one `_config.yaml`
+    check per subdirectory.
+    """
+    with os.scandir(path) as entries:
+        entries = sorted(entries, key=lambda entry: entry.name)
+    items = []
+    for entry in entries:
+        if entry.is_dir():
+            if os.path.isfile(os.path.join(entry.path, "_config.yaml")):
+                items.append(("section", entry.name, _scan_directory(entry.path)))
+        elif entry.name.endswith(".md"):
+            items.append(("page", entry.name, None))
+    return items
+
+
+def _read_content(
+    path: str, items: list, cache: BuildCache, workers: int
+) -> dict[str, object]:
+    """Read every section config and page under `path`, `workers` at a time.
+
+    Returns the parsed section config or ``(front matter, body)`` per path.
+    """
+    jobs = []
+
+    def gather(path: str, items: list) -> None:
+        for kind, name, section_items in items:
+            item_path = os.path.join(path, name)
+            jobs.append((kind, item_path))
+            if kind == "section":
+                gather(item_path, section_items)
+
+    def read(job: tuple[str, str]):
+        kind, item_path = job
+        if kind == "section":
+            return load_config(item_path)
+        return cache.read_page(item_path, _extract_config_header)
+
+    gather(path, items)
+    if workers > 1 and len(jobs) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            results = list(executor.map(read, jobs))
+    else:
+        results = [read(job) for job in jobs]
+    return {item_path: result for (_, item_path), result in zip(jobs, results)}
+
+
+def _pages_from_items(
+    path: str,
+    subfolder: str,
+    items: list,
+    contents: dict[str, object],
+    scheduled: list[dict] | None,
+) -> list[dict]:
     pages_metadata = []
     if subfolder:
         subfolder = f"{subfolder}/"
-    for filename in os.listdir(path):
-        if os.path.isdir(os.path.join(path, filename)):
-            try:
-                section_config = load_config(os.path.join(path, filename))
-            except FileNotFoundError:
-                continue
+    for kind, filename, section_items in items:
+        if kind == "section":
             section_path = os.path.join(path, filename)
-            section_pages_metadata = collect_pages_metadata(
-                section_path, subfolder=filename
+            section_config = contents[section_path]
+            section_pages_metadata = _pages_from_items(
+                section_path, filename, section_items, contents, scheduled
             )
             pages_metadata.extend(section_pages_metadata)
             page_meta = {
@@ -98,19 +445,26 @@ def collect_pages_metadata(path: str, subfolder: str = "") -> list[dict]:
                 "template": section_config.get("template", "list.html"),
                 "pages": section_pages_metadata,
                 "publish_date": section_config.get("publish_date", None),
-                "date": section_config.get("date", date.today().isoformat()),
+                "date": section_config.get("date"),
                 "published": section_config.get("published", True),
                 "config": section_config,
                 "content": section_config.get("content", ""),
             }
             pages_metadata.append(page_meta)
-        if filename.endswith(".md"):
+        else:
             filepath = os.path.join(path, filename)
-            with open(filepath, "r") as file:
-                page_config, content = _extract_config_header(file.read())
+            page_config, content = contents[filepath]
 
             # Skip pages that shouldn't be processed
             if not should_process(page_config):
+                publish_date = scheduled_date(page_config)
+                if scheduled is not None and publish_date is not None:
+                    scheduled.append(
+                        {
+                            "filename": f"{subfolder}{filename}",
+                            "publish_date": publish_date.isoformat(),
+                        }
+                    )
                 continue
 
             # Create page metadata
@@ -121,20 +475,247 @@ def collect_pages_metadata(path: str, subfolder: str = "") -> list[dict]:
                 "url": f"/{subfolder}{filename.replace('.md', '.html')}",
                 "title": page_config.get("title", default_title),
                 "description": page_config.get("description", ""),
-                "date": page_config.get("date", date.today().isoformat()),
+                "date": page_config.get("date"),
                 "publish_date": page_config.get("publish_date", None),
                 "nav_order": page_config.get("nav_order", 999),
                 "in_nav": page_config.get("in_nav", False),
                 "content": content,
                 "config": page_config,
+                "source_path": filepath,
             }
             pages_metadata.append(page_meta)
+    return pages_metadata
+
+
+def collect_pages_metadata(
+    path: str,
+    subfolder: str = "",
+    cache: BuildCache | None = None,
+    scheduled: list[dict] | None = None,
+    date_source: str = "auto",
+    workers: int = SCAN_WORKERS,
+) -> list[dict]:
+    """Collect metadata from all markdown files in the path.
+
+    The tree is walked first, then all files are read and parsed by a pool of
+    `workers` threads, which hides per-file latency on slow storage. Pages
+    come back in the same order regardless: sorted by name within each
+    directory, with a section's pages before the section itself.
+
+    Pages held back by a future `publish_date` are appended to `scheduled`
+    (as their filename and publish date), if given. Pages without a `date`
+    get one from `date_source` (see `dates.source_dates`).
+    """
+    cache = cache or default_cache
+    items = _scan_directory(path)
+    contents = _read_content(path, items, cache, workers)
+    pages_metadata = _pages_from_items(path, subfolder, items, contents, scheduled)
+
+    if not subfolder:
+        _assign_dates(pages_metadata, cache, date_source)
 
     # Sort pages by nav_order, then by title
     # pages_metadata.sort(key=lambda x: (x["nav_order"], x["title"]))
     return pages_metadata
 
 
+def _page_terms(page: dict, taxonomy: str) -> list[str]:
+    """Return the terms a page declares for a taxonomy in its front matter."""
+    terms = (page.get("config") or {}).get(taxonomy) or []
+    if isinstance(terms, str):
+        terms = terms.split(",")
+    return [str(term).strip() for term in terms if str(term).strip()]
+
+
+def build_taxonomies(
+    pages_metadata: list[dict], taxonomies: list[str] | None = None
+) -> dict[str, dict[str, list[dict]]]:
+    """Build a term -> pages inverted index for each taxonomy.
+
+    The index is computed once per build so templates can look up the pages
+    for a term (``site.taxonomies.tags["python"]``) without scanning
+    ``site.pages``. Pages are ordered newest first within each term.
+    """
+    index: dict[str, dict[str, list[dict]]] = {
+        name: {} for name in (taxonomies or ["tags"])
+    }
+    for page in pages_metadata:
+        for name, terms in index.items():
+            for term in _page_terms(page, name):
+                terms.setdefault(term, []).append(page)
+
+    for terms in index.values():
+        for term_pages in terms.values():
+            term_pages.sort(key=lambda page: str(page.get("date", "")), reverse=True)
+    return index
+
+
+def taxonomy_slugs(terms) -> dict[str, str]:
+    """Give every term of a taxonomy its own URL slug.
+
+    Terms whose slugs would clash (``C++`` and ``C``) are numbered in sorted
+    order (``c``, ``c-2``); a term with nothing to slugify (``!!!``) gets a
+    short digest of itself, so no term overwrites another's pages or the
+    taxonomy's term cloud.
+    """
+    ordered = sorted(terms, key=lambda term: (term.lower(), term))
+    bases = {
+        term: slugify(term)
+        or "term-" + hashlib.sha1(term.encode("utf-8")).hexdigest()[:8]
+        for term in ordered
+    }
+    taken = set(bases.values())
+    slugs: dict[str, str] = {}
+    used: set[str] = set()
+    for term in ordered:
+        slug = bases[term]
+        number = 2
+        while slug in used or (slug != bases[term] and slug in taken):
+            slug = f"{bases[term]}-{number}"
+            number += 1
+        used.add(slug)
+        slugs[term] = slug
+    return slugs
+
+
+@pass_context
+def term_slug(context, term, taxonomy: str = "tags") -> str:
+    """Template filter: the slug of a taxonomy term's pages in this build."""
+    slugs = context.get("site", {}).get("taxonomy_slugs", {}).get(taxonomy, {})
+    return slugs.get(str(term).strip()) or slugify(term)
+
+
+def _paginated_filename(base: str, number: int) -> str:
+    """Return the output filename for page ``number`` of a paginated listing."""
+    if number == 1:
+        return f"{base}/index.html"
+    return f"{base}/page/{number}/index.html"
+
+
+def generate_taxonomy_pages(
+    taxonomies: dict[str, dict[str, list[dict]]], per_page: int = 10
+) -> list[dict]:
+    """Generate paginated term pages plus a term cloud for every taxonomy.
+
+    Term pages live at ``/<taxonomy>/<slug>/index.html`` with further pages
+    at ``/<taxonomy>/<slug>/page/<n>/index.html``; the cloud, listing every
+    term with its page count, lives at ``/<taxonomy>/index.html``. Slugs
+    come from `taxonomy_slugs`.
+    """
+    per_page = max(int(per_page), 1)
+    generated = []
+    for name, terms in taxonomies.items():
+        if not terms:
+            continue
+        slugs = taxonomy_slugs(terms)
+        cloud = []
+        for term in sorted(terms, key=str.lower):
+            term_pages = terms[term]
+            base = f"{name}/{slugs[term]}"
+            cloud.append(
+                {
+                    "name": term,
+                    "title": term,
+                    "slug": slugs[term],
+                    "url": f"/{base}/index.html",
+                    "count": len(term_pages),
+                }
+            )
+            total = (len(term_pages) + per_page - 1) // per_page
+            for number in range(1, total + 1):
+                filename = _paginated_filename(base, number)
+                start = (number - 1) * per_page
+                generated.append(
+                    {
+                        "filename": filename,
+                        "url": f"/{filename}",
+                        "title": term,
+                        "description": "",
+                        "date": term_pages[0].get("date"),
+                        "publish_date": None,
+                        "nav_order": 999,
+                        "in_nav": False,
+                        "content": "",
+                        "pages": term_pages[start : start + per_page],
+                        "taxonomy": {"name": name, "term": term},
+                        "paginator": {
+                            "page": number,
+                            "pages": total,
+                            "per_page": per_page,
+                            "total": len(term_pages),
+                            "prev_url": (
+                                f"/{_paginated_filename(base, number - 1)}"
+                                if number > 1
+                                else None
+                            ),
+                            "next_url": (
+                                f"/{_paginated_filename(base, number + 1)}"
+                                if number < total
+                                else None
+                            ),
+                        },
+                        "config": {"title": term, "template": "tag.html"},
+                    }
+                )
+        generated.append(
+            {
+                "filename": f"{name}/index.html",
+                "url": f"/{name}/index.html",
+                "title": name.title(),
+                "description": "",
+                "date": None,
+                "publish_date": None,
+                "nav_order": 999,
+                "in_nav": False,
+                "content": "",
+                "terms": cloud,
+                "taxonomy": {"name": name, "term": None},
+                "config": {"title": name.title(), "template": "tags.html"},
+            }
+        )
+    return generated
+
+
+def build_page_relations(
+    pages_metadata: list[dict], config: dict, cache: BuildCache | None = None
+) -> tuple[dict, dict]:
+    """Return the prev/next index and the related-posts map for the site.
+
+    Both only depend on each page's URL, title, date, description, tags and
+    section, so they are reused from `cache` until one of those changes.
+    """
+    limit = int(config.get("related_posts", DEFAULT_RELATED_LIMIT))
+    signature = content_digest(
+        json.dumps(
+            [
+                limit,
+                [
+                    (
+                        page["url"],
+                        page["title"],
+                        page.get("date"),
+                        page.get("description", ""),
+                        _page_terms(page, "tags"),
+                        [child["url"] for child in page.get("pages", [])],
+                    )
+                    for page in pages_metadata
+                ],
+            ],
+            default=str,
+        )
+    )
+    return (cache or default_cache).memoize(
+        "page_relations",
+        signature,
+        lambda: (
+            build_section_index(pages_metadata),
+            related_pages(
+                pages_metadata, lambda page: _page_terms(page, "tags"), limit
+            ),
+        ),
+    )
+
+
 def generate_navigation(pages_metadata: list[dict]) -> list[dict]:
     """Generate navigation menu from pages metadata."""
     nav_items = []
@@ -160,22 +741,20 @@ def generate_sitemap(pages_metadata: list[dict], config: dict) -> str:
 
     for page in pages_metadata:
         url = base_url.rstrip("/") + page["url"]
-        # Use publish_date or date, fallback to today
+        # Use publish_date or date; leave lastmod out rather than guess
         lastmod = page["publish_date"] or page["date"]
+        lastmod_tag = ""
         if lastmod:
             try:
                 if isinstance(lastmod, str):
                     lastmod = date.fromisoformat(lastmod)
-                lastmod_str = lastmod.isoformat()
-            except (ValueError, TypeError):
-                lastmod_str = date.today().isoformat()
-        else:
-            lastmod_str = date.today().isoformat()
+                lastmod_tag = f"\n        <lastmod>{lastmod.isoformat()}</lastmod>"
+            except (ValueError, TypeError, AttributeError):
+                pass
 
         sitemap_entries.append(f"""
     <url>
-        <loc>{url}</loc>
-        <lastmod>{lastmod_str}</lastmod>
+        <loc>{url}</loc>{lastmod_tag}
         <changefreq>weekly</changefreq>
         <priority>0.8</priority>
     </url>""")
@@ -186,8 +765,12 @@ def generate_sitemap(pages_metadata: list[dict], config: dict) -> str:
     return sitemap
 
 
-def copy_static_directories(source_path: str, output_path: str) -> int:
-    """Copy directories that don't have _config.yaml to output directory."""
+def copy_static_directories(source_path: str, output_path) -> int:
+    """Copy directories that don't have _config.yaml to the output.
+
+    `output_path` is a directory or an output writer.
+    """
+    writer = as_writer(output_path)
     copied_dirs = 0
 
     for item in os.listdir(source_path):
@@ -207,18 +790,19 @@ def copy_static_directories(source_path: str, output_path: str) -> int:
             continue
 
         # Copy the directory to output
-        output_dir = os.path.join(output_path, item)
-        if os.path.exists(output_dir):
-            shutil.rmtree(output_dir)
-        shutil.copytree(item_path, output_dir)
+        writer.copy_tree(item_path, item)
         copied_dirs += 1
         print(f"Copied static directory: {item}")
 
     return copied_dirs
 
 
-def copy_theme_assets(source_path: str, theme_name: str, output_path: str) -> int:
-    """Copy non-template files from theme directory to output directory."""
+def copy_theme_assets(source_path: str, theme_name: str, output_path) -> int:
+    """Copy non-template files from the theme directory to the output.
+
+    `output_path` is a directory or an output writer.
+    """
+    writer = as_writer(output_path)
     copied_files = 0
 
     # Determine theme directory (prioritize global themes)
@@ -248,108 +832,402 @@ def copy_theme_assets(source_path: str, theme_name: str, output_path: str) -> in
             # Skip template files but copy other assets like CSS, JS, images
             file_ext = os.path.splitext(item)[1].lower()
             if file_ext not in template_extensions:
-                output_file = os.path.join(output_path, item)
-                shutil.copy2(item_path, output_file)
+                writer.copy(item_path, item)
                 copied_files += 1
                 print(f"Copied theme asset: {item}")
 
         elif os.path.isdir(item_path):
             # Copy subdirectories (like assets/, css/, js/, images/)
-            output_subdir = os.path.join(output_path, item)
-            if os.path.exists(output_subdir):
-                shutil.rmtree(output_subdir)
-            shutil.copytree(item_path, output_subdir)
+            writer.copy_tree(item_path, item)
             copied_files += 1
             print(f"Copied theme directory: {item}")
 
     return copied_files
 
 
-def generate_site(path: str, output: str) -> dict:
-    """Generate the static site from content at path to output directory."""
+def _activate_navigation(navigation: list[dict], page_url: str) -> list[dict]:
+    """Return a copy of the navigation with the page's item marked active."""
+    active_navigation = deepcopy(navigation)
+
+    # If page is in a subfolder (like /blog/article.html),
+    # activate the section's nav item (like /blog/index.html)
+    if "/" in page_url.strip("/"):
+        # Extract "blog" from "/blog/article.html"
+        section_name = page_url.split("/")[1]
+        section_url = f"/{section_name}/index.html"
+
+        # Find and activate the corresponding nav item
+        for nav_item in active_navigation:
+            if nav_item["url"] == section_url:
+                nav_item["active"] = True
+                break
+    else:
+        # For root-level pages, activate exact match
+        for nav_item in active_navigation:
+            if nav_item["url"] == page_url:
+                nav_item["active"] = True
+                break
+    return active_navigation
+
+
+def published_since(manifest: dict, today: date | None = None):
+    """Select the pages a build recorded in `manifest` must update for pages
+    whose scheduled publish date has come.
+
+    Returns None if no scheduled page is due yet. Otherwise returns a function
+    for generate_site's `only`, selecting the newly published pages, the
+    section and taxonomy listings that contain them, their previous/next
+    neighbours and the home page, or every page if one of them is shown in
+    the navigation.
+    """
+    today = today or date.today()
+    due = {
+        entry["filename"]
+        for entry in manifest.get("scheduled", [])
+        if date.fromisoformat(entry["publish_date"]) <= today
+    }
+    if not due:
+        return None
+
+    def select(pages: list[dict]) -> set[str]:
+        published = [page for page in pages if page["filename"] in due]
+        if any(page.get("in_nav") for page in published):
+            return {page["filename"] for page in pages}
+        due_urls = {page["url"] for page in published}
+        selected = {"index.md"} | due
+        for page in pages:
+            children = {child["filename"] for child in page.get("pages", [])}
+            taxonomy = page.get("taxonomy")
+            neighbours = [page.get("prev") or {}, page.get("next") or {}]
+            if children & due or any(
+                neighbour.get("url") in due_urls for neighbour in neighbours
+            ):
+                selected.add(page["filename"])
+            elif taxonomy is not None:
+                # Term listings shift and term counts change
+                for published_page in published:
+                    terms = _page_terms(published_page, taxonomy["name"])
+                    if terms and taxonomy["term"] in terms + [None]:
+                        selected.add(page["filename"])
+        return selected
+
+    return select
+
+
+def select_paths(patterns: list[str]):
+    """Select pages by path, for generate_site's `only`.
+
+    Patterns are relative to the site root. A directory (``blog/`` or
+    ``blog``) selects everything in it; anything else is a glob matched
+    against page filenames (``blog/2024-*.md``). The section index of every
+    selected page is selected too, up to the top-level section, along with
+    the taxonomy listings that contain it.
+    """
+    patterns = [
+        pattern.strip().removeprefix("./").lstrip("/") or "*" for pattern in patterns
+    ]
+
+    def matches(filename: str) -> bool:
+        return any(
+            filename.startswith(pattern.rstrip("/") + "/")
+            or fnmatch.fnmatchcase(filename, pattern)
+            for pattern in patterns
+        )
+
+    def select(pages: list[dict]) -> set[str]:
+        matched = [page for page in pages if matches(page["filename"])]
+        selected = {page["filename"] for page in matched}
+        # Sections come after their pages, so one pass reaches every ancestor
+        for page in pages:
+            taxonomy = page.get("taxonomy")
+            if taxonomy is None:
+                if any(
+                    child["filename"] in selected for child in page.get("pages", [])
+                ):
+                    selected.add(page["filename"])
+                continue
+            # Term listings and the term cloud show the selected pages
+            for matched_page in matched:
+                terms = _page_terms(matched_page, taxonomy["name"])
+                if terms and taxonomy["term"] in terms + [None]:
+                    selected.add(page["filename"])
+                    break
+        return selected
+
+    return select
+
+
+def generate_site(
+    path: str,
+    output: "str | OutputWriter",
+    cache: BuildCache | None = None,
+    plugins: list | None = None,
+    only=None,
+) -> dict:
+    """Generate the static site from content at path to output.
+
+    `output` is a directory, an archive file name (e.g. ``site.tar.gz``, see
+    `output.open_output`) or an output writer, which the caller closes.
+    `cache` carries warm state (templates, parsed and rendered content) between
+    builds; it defaults to a process-wide cache. `plugins` are used in addition
+    to those listed under `plugins` in the site config (see `plugins.HOOKS`).
+    """
+    if isinstance(output, OutputWriter):
+        return _build_site(path, output, cache or default_cache, plugins, only)
+    with open_output(output) as writer:
+        return _build_site(path, writer, cache or default_cache, plugins, only)
+
+
+def _build_site(
+    path: str, writer: OutputWriter, cache: BuildCache, plugins: list | None, only
+) -> dict:
     config = load_config(path)
-    os.makedirs(output, exist_ok=True)
+    plugin_manager = PluginManager.from_config(config, plugins)
+    cache.begin_build(path)
 
     # Step 1: Collect all pages metadata
-    pages_metadata = collect_pages_metadata(path)
+    scheduled: list[dict] = []
+    pages_metadata = collect_pages_metadata(
+        path,
+        cache=cache,
+        scheduled=scheduled,
+        date_source=config.get("date_source", "auto"),
+        workers=int(config.get("scan_workers", SCAN_WORKERS)),
+    )
+    scheduled.sort(key=lambda entry: (entry["publish_date"], entry["filename"]))
+    next_publish = scheduled[0]["publish_date"] if scheduled else None
+    plugin_manager.call("on_pages_collected", pages=pages_metadata, config=config)
+    taxonomies = build_taxonomies(pages_metadata, config.get("taxonomies"))
+    taxonomy_pages = generate_taxonomy_pages(taxonomies, config.get("paginate", 10))
 
     # Step 2: Generate site-wide context
     site_context = {
         "config": config,
         "pages": pages_metadata,
+        "taxonomies": taxonomies,
+        "taxonomy_slugs": {
+            name: taxonomy_slugs(terms) for name, terms in taxonomies.items()
+        },
         "sitemap_url": "/sitemap.xml",
+        "feed_url": "/feed.xml",
     }
 
     navigation = generate_navigation(pages_metadata)
+    section_index, related = build_page_relations(pages_metadata, config, cache)
+    for page_meta in pages_metadata:
+        neighbours = section_index.get(page_meta["url"], {})
+        page_meta["prev"] = neighbours.get("prev")
+        page_meta["next"] = neighbours.get("next")
+        page_meta["related"] = related.get(page_meta["url"], [])
 
     # Step 3: Copy static directories (images, assets, etc.)
-    static_dirs_copied = copy_static_directories(path, output)
-
     # Step 4: Copy theme assets (CSS, JS, images, etc.)
-    theme_assets_copied = copy_theme_assets(
-        path, config.get("theme", "default"), output
-    )
+    # A partial build (`only`) leaves both as they are.
+    static_dirs_copied = theme_assets_copied = 0
+    if only is None:
+        static_dirs_copied = copy_static_directories(path, writer)
+        theme_assets_copied = copy_theme_assets(
+            path, config.get("theme", "default"), writer
+        )
 
     # Step 5: Generate sitemap
-    sitemap_content = generate_sitemap(pages_metadata, config)
-    sitemap_path = os.path.join(output, "sitemap.xml")
-    with open(sitemap_path, "w") as file:
-        file.write(sitemap_content)
+    sitemap_content = generate_sitemap(pages_metadata + taxonomy_pages, config)
+    writer.write("sitemap.xml", sitemap_content)
 
     # Step 6: Generate HTML pages
     stats = {
         "pages": 0,
+        "unchanged": 0,
         "errors": 0,
         "static_dirs": static_dirs_copied,
         "theme_assets": theme_assets_copied,
     }
-    for page_meta in pages_metadata:
-        try:
-            # Find which navigation item should be active
-            active_navigation = deepcopy(navigation)
-            page_url = page_meta["url"]
-
-            # If page is in a subfolder (like /blog/article.html),
-            # activate the section's nav item (like /blog/index.html)
-            if "/" in page_url.strip("/"):
-                # Extract "blog" from "/blog/article.html"
-                section_name = page_url.split("/")[1]
-                section_url = f"/{section_name}/index.html"
-
-                # Find and activate the corresponding nav item
-                for nav_item in active_navigation:
-                    if nav_item["url"] == section_url:
-                        nav_item["active"] = True
-                        break
-            else:
-                # For root-level pages, activate exact match
-                for nav_item in active_navigation:
-                    if nav_item["url"] == page_url:
-                        nav_item["active"] = True
-                        break
+    # A partial build (`only`) only needs the Markdown of the pages it builds,
+    # the pages they list and the pages shown in feeds.
+    selected = needed = None
+    if only is not None:
+        selected = only(pages_metadata + taxonomy_pages)
+        needed = set(selected)
+        for page_meta in pages_metadata + taxonomy_pages:
+            if page_meta["filename"] in selected:
+                needed.update(child["filename"] for child in page_meta.get("pages", []))
+        if config.get("feeds", True):
+            needed |= feed_candidates(pages_metadata, config)
 
+    # Render Markdown for every page up front, so listings can show the
+    # excerpt and reading time of any page. Later stages (feeds) reuse the HTML.
+    for page_meta in pages_metadata + taxonomy_pages:
+        if needed is not None and page_meta["filename"] not in needed:
+            # Still use what's already rendered, so site-wide metadata (and
+            # with it page fingerprints) matches that of a full build
+            document = cache.rendered.get(content_digest(page_meta["content"]))
+            if document is None:
+                continue
+        else:
+            try:
+                document = cache.render(page_meta["content"], render_markdown)
+            except Exception as e:
+                print(f"Error rendering {page_meta['filename']}: {e}")
+                stats["errors"] += 1
+                continue
+        page_meta.update(
+            html=document["html"],
+            toc=document["toc"],
+            excerpt=document["excerpt"],
+            word_count=document["word_count"],
+            reading_time=page_meta["config"].get(
+                "reading_time", document["reading_time"]
+            ),
+        )
+        if needed is not None and page_meta["filename"] not in needed:
+            continue
+        if config.get("image_attributes", True):
+            page_meta["html"], page_meta["image_sizes"] = add_image_attributes(
+                page_meta["html"], page_meta["url"], path, cache
+            )
+
+    # Pages whose inputs (content, site-wide metadata, plugins and every
+    # template file they were rendered with) match the previous build's
+    # manifest are kept.
+    previous_pages = writer.load_manifest()["pages"]
+    site_signature = _site_signature(config, pages_metadata)
+    plugin_signatures = [
+        plugin_signature(plugin, config) for plugin in plugin_manager.plugins
+    ]
+    template_memo: dict = {}
+
+    def build_page(page_meta: dict) -> tuple[str, str, dict | None]:
+        """Render and write one page; return its outcome and manifest entry."""
+        output_filename = page_meta["filename"].replace(".md", ".html")
+        try:
+            template_name = page_meta["config"].get("template", "page.html")
             template = template_loader(
                 config["source_path"],
                 config.get("theme", "default"),
-                page_meta["config"].get("template", "page.html"),
+                template_name,
+                cache=cache,
+            )
+            templates = _template_signature(template, template_name, template_memo)
+            fingerprint = content_digest(
+                json.dumps(
+                    [
+                        site_signature,
+                        plugin_signatures,
+                        output_filename,
+                        page_meta["content"],
+                        page_meta.get("image_sizes"),
+                        templates,
+                    ],
+                    default=str,
+                )
             )
+            previous = previous_pages.get(output_filename)
+            if (
+                previous is not None
+                and previous.get("fingerprint") == fingerprint
+                and writer.exists(output_filename)
+            ):
+                plugin_manager.call("on_page_unchanged", page=page_meta, config=config)
+                return "unchanged", output_filename, previous
+
             page_html = template.render(
-                content=md.render(page_meta["content"]),
+                content=page_meta["html"],
+                toc=page_meta["toc"],
+                excerpt=page_meta["excerpt"],
+                reading_time=page_meta["reading_time"],
                 meta=page_meta["config"],
                 site=site_context,
-                navigation=active_navigation,
+                navigation=_activate_navigation(navigation, page_meta["url"]),
                 section_pages=page_meta.get("pages", []),
+                prev_page=page_meta.get("prev"),
+                next_page=page_meta.get("next"),
+                related_pages=page_meta.get("related", []),
+                paginator=page_meta.get("paginator"),
+                taxonomy=page_meta.get("taxonomy"),
+                terms=page_meta.get("terms", []),
+            )
+            page_html = plugin_manager.filter(
+                "on_page_rendered", "html", page_html, page=page_meta, config=config
             )
 
-            output_filename = page_meta["filename"].replace(".md", ".html")
-            output_file = os.path.join(output, output_filename)
-            os.makedirs(os.path.dirname(output_file), exist_ok=True)
-            with open(output_file, "w") as file:
-                file.write(page_html)
-            stats["pages"] += 1
+            writer.write(output_filename, page_html)
+            entry = {
+                "fingerprint": fingerprint,
+                "templates": [filename for filename, _ in templates],
+            }
+            return "pages", output_filename, entry
 
         except Exception as e:
             print(f"Error processing {page_meta['filename']}: {e}")
+            return "errors", output_filename, None
+
+    # Templates render in a thread pool when `render_workers` is set; hooks of
+    # plugins that aren't parallel-safe are serialized by the plugin manager.
+    pages_to_build = [
+        page for page in pages_metadata + taxonomy_pages if "html" in page
+    ]
+    if selected is not None:
+        pages_to_build = [
+            page for page in pages_to_build if page["filename"] in selected
+        ]
+    workers = int(config.get("render_workers", 1))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(build_page, pages_to_build))
+    else:
+        results = [build_page(page_meta) for page_meta in pages_to_build]
+
+    built_pages = {}
+    if only is not None:
+        # Pages left out of a partial build keep their previous entries
+        built_pages.update(previous_pages)
+    # Writes may still be queued; a page whose file couldn't be written counts
+    # as an error and is left out of the manifest, so it's retried next time.
+    failed_writes = writer.flush()
+    for outcome, output_filename, entry in results:
+        if output_filename in failed_writes and outcome == "pages":
+            error = failed_writes[output_filename]
+            print(f"Error writing {output_filename}: {error}")
+            outcome, entry = "errors", None
+        stats[outcome] += 1
+        if entry is not None:
+            built_pages[output_filename] = entry
+    # Other files (the sitemap) went through the same queue
+    page_files = {output_filename for _, output_filename, _ in results}
+    for name, error in sorted(failed_writes.items()):
+        if name not in page_files:
+            print(f"Error writing {name}: {error}")
             stats["errors"] += 1
+    # The next time a scheduled page is due, for `slarti serve` to rebuild
+    # (see `published_since`)
+    stats["next_publish"] = next_publish
+    writer.save_manifest(
+        {
+            "version": MANIFEST_VERSION,
+            "pages": built_pages,
+            "scheduled": scheduled,
+            "next_publish": next_publish,
+        }
+    )
+
+    # Step 7: Generate Atom/RSS feeds from the HTML rendered above
+    if config.get("feeds", True):
+        stats["feeds"] = generate_feeds(pages_metadata, config, writer)
 
+    # Step 8: Optionally check internal links in the finished output
+    if config.get("check_links", False) and isinstance(writer, DirectoryOutput):
+        broken = check_links(writer.path)
+        for link in broken:
+            print(
+                f"Broken link in {link['source']}:{link['line']}: "
+                f"{link['target']} ({link['reason']})"
+            )
+        stats["broken_links"] = len(broken)
+
+    cache.end_build(path)
+    plugin_manager.call(
+        "on_build_finished", stats=stats, config=config, output=writer.path
+    )
+    if plugin_manager.plugins:
+        stats["hooks"] = plugin_manager.timings
     return stats
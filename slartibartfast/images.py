@@ -0,0 +1,205 @@
+"""Image dimensions for rendered pages, read from file headers.
+
+Only the first bytes of an image are read: the fixed-size header of a PNG,
+GIF or WebP file, the segment headers of a JPEG up to its frame header, or
+the opening ``<svg>`` tag of an SVG. Sizes are cached in the build cache by
+path, mtime and file size, so unchanged images are never re-read.
+"""
+
+import os
+import posixpath
+import re
+import struct
+from urllib.parse import unquote, urlsplit
+
+from .cache import BuildCache, default_cache
+
+# An SVG's root element is expected within this many bytes.
+SVG_HEADER_BYTES = 8192
+
+_IMG = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+_ATTRIBUTE = re.compile(
+    r"""([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+)))?"""
+)
+_SVG_TAG = re.compile(rb"<svg\b[^>]*>", re.IGNORECASE)
+_SVG_ATTRIBUTE = re.compile(rb"""\b(width|height|viewBox)\s*=\s*["']([^"']*)["']""")
+_SVG_LENGTH = re.compile(rb"^\s*([0-9]*\.?[0-9]+)\s*(px)?\s*$")
+# JPEG start-of-frame markers; C4, C8 and CC are other segments.
+_JPEG_FRAMES = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7}
+_JPEG_FRAMES |= {0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_JPEG_STANDALONE = {0x01, *range(0xD0, 0xD8)}
+
+
+def _jpeg_size(file) -> tuple[int, int] | None:
+    file.seek(2)
+    while True:
+        byte = file.read(1)
+        while byte == b"\xff":
+            byte = file.read(1)
+        if not byte:
+            return None
+        marker = byte[0]
+        if marker in _JPEG_STANDALONE:
+            continue
+        header = file.read(2)
+        if len(header) < 2:
+            return None
+        (length,) = struct.unpack(">H", header)
+        if marker in _JPEG_FRAMES:
+            frame = file.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">xHH", frame)
+            return width, height
+        file.seek(length - 2, os.SEEK_CUR)
+        if file.read(1) != b"\xff":
+            return None
+
+
+def _webp_size(header: bytes) -> tuple[int, int] | None:
+    chunk = header[12:16]
+    if chunk == b"VP8 " and header[23:26] == b"\x9d\x01\x2a":
+        width, height = struct.unpack("<HH", header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and header[20:21] == b"\x2f":
+        (bits,) = struct.unpack("<I", header[21:25])
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        width = int.from_bytes(header[24:27], "little") + 1
+        height = int.from_bytes(header[27:30], "little") + 1
+        return width, height
+    return None
+
+
+def _svg_size(header: bytes) -> tuple[int, int] | None:
+    tag = _SVG_TAG.search(header)
+    if tag is None:
+        return None
+    attributes = dict(_SVG_ATTRIBUTE.findall(tag.group(0)))
+    lengths = [
+        _SVG_LENGTH.match(attributes.get(name, b"")) for name in (b"width", b"height")
+    ]
+    if all(lengths):
+        return tuple(round(float(length.group(1))) for length in lengths)
+    view_box = attributes.get(b"viewBox", b"").replace(b",", b" ").split()
+    if len(view_box) == 4:
+        try:
+            width, height = float(view_box[2]), float(view_box[3])
+        except ValueError:
+            return None
+        if lengths[0] and width:
+            width_px = float(lengths[0].group(1))
+            return round(width_px), round(width_px * height / width)
+        return round(width), round(height)
+    return None
+
+
+def image_size(filepath: str) -> tuple[int, int] | None:
+    """Return the pixel width and height of a PNG, JPEG, GIF, WebP or SVG
+    file from its header, or None if it isn't one of those (or is damaged)."""
+    with open(filepath, "rb") as file:
+        header = file.read(30)
+        if header.startswith(b"\x89PNG\r\n\x1a\n") and header[12:16] == b"IHDR":
+            return struct.unpack(">II", header[16:24])
+        if header[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", header[6:10])
+        if header.startswith(b"RIFF") and header[8:12] == b"WEBP":
+            return _webp_size(header)
+        if header.startswith(b"\xff\xd8"):
+            return _jpeg_size(file)
+        if filepath.lower().endswith(".svg"):
+            return _svg_size(header + file.read(SVG_HEADER_BYTES - len(header)))
+    return None
+
+
+def cached_image_size(
+    filepath: str, cache: BuildCache | None = None
+) -> tuple[int, int] | None:
+    """Return `image_size(filepath)`, reusing it while the file is unchanged.
+
+    Missing files and unreadable images are None."""
+    cache = cache or default_cache
+    key = os.path.abspath(filepath)
+    try:
+        stat = os.stat(key)
+    except OSError:
+        return None
+    entry = cache.image_sizes.get(key)
+    if entry is None or entry[:2] != (stat.st_mtime_ns, stat.st_size):
+        try:
+            size = image_size(key)
+        except (OSError, struct.error):
+            size = None
+        entry = cache.image_sizes[key] = (stat.st_mtime_ns, stat.st_size, size)
+    return entry[2]
+
+
+def _attributes(tag: str) -> dict[str, str]:
+    attributes = {}
+    for match in _ATTRIBUTE.finditer(tag, 4):
+        value = match.group(2) or match.group(3) or match.group(4) or ""
+        attributes.setdefault(match.group(1).lower(), value)
+    return attributes
+
+
+def _source_file(source_path: str, page_url: str, src_path: str) -> str | None:
+    """Return the file under `source_path` that an image path refers to from
+    `page_url`, or None if it would be outside `source_path`."""
+    src_path = unquote(src_path)
+    if "\0" in src_path:
+        return None
+    page_dir = posixpath.dirname(urlsplit(page_url).path) or "/"
+    url_path = posixpath.normpath(posixpath.join(page_dir, src_path))
+    root = os.path.realpath(source_path)
+    path = os.path.realpath(os.path.join(root, url_path.lstrip("/")))
+    if os.path.commonpath([root, path]) != root:
+        return None
+    return path
+
+
+def add_image_attributes(
+    html: str, page_url: str, source_path: str, cache: BuildCache | None = None
+) -> tuple[str, dict[str, list[int]]]:
+    """Add ``width``/``height``, ``loading="lazy"`` and ``decoding="async"``
+    to the ``<img>`` tags in a page's HTML.
+
+    Image sources are resolved against `page_url` to files under
+    `source_path`; sources that resolve outside it are left unsized.
+    Attributes a tag already has are kept. Returns the new HTML and the size
+    used for each source.
+    """
+    if "<img" not in html.lower():
+        return html, {}
+    sizes: dict[str, list[int]] = {}
+
+    def replace(match: re.Match) -> str:
+        tag = match.group(0)
+        attributes = _attributes(tag)
+        extra = []
+        src = attributes.get("src", "")
+        url = urlsplit(src)
+        path = None
+        if (
+            url.path
+            and not url.scheme
+            and not url.netloc
+            and "width" not in attributes
+            and "height" not in attributes
+        ):
+            path = _source_file(source_path, page_url, url.path)
+        if path is not None:
+            size = cached_image_size(path, cache)
+            if size is not None:
+                sizes[src] = list(size)
+                extra.append(f'width="{size[0]}" height="{size[1]}"')
+        if "loading" not in attributes:
+            extra.append('loading="lazy"')
+        if "decoding" not in attributes:
+            extra.append('decoding="async"')
+        if not extra:
+            return tag
+        closing = " />" if tag.endswith("/>") else ">"
+        head = tag[: -len(closing.strip())].rstrip()
+        return f"{head} {' '.join(extra)}{closing}"
+
+    return _IMG.sub(replace, html), sizes
@@ -0,0 +1,168 @@
+"""Internal link checker for a built site.
+
+Every HTML file in the output is scanned with regular expressions (no DOM
+parse) for its element IDs and its ``href``/``src`` targets. Each internal
+target must then name a file in the output and, if it has a fragment, an
+ID in that file. Scan results are cached outside the output (so they aren't
+deployed with the site), keyed by each file's mtime and size, so a re-check
+only reads the pages that changed; resolving the links themselves is a set
+lookup and always covers every page.
+"""
+
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import os
+import re
+from urllib.parse import unquote, urljoin, urlsplit
+
+# Below this many files, starting worker processes costs more than it saves.
+PROCESS_MIN_FILES = 500
+HTML_EXTENSIONS = (".html", ".htm")
+
+# Attribute names must follow whitespace, so `data-src=` isn't a link and
+# `data-id=` isn't an anchor; `name` only defines anchors on <a> elements.
+_ATTRIBUTE = re.compile(
+    r"""(?<=\s)(href|src)\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE
+)
+_ID = re.compile(r"""(?<=\s)id\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+_ANCHOR_NAME = re.compile(
+    r"""<a\s[^>]*?(?<=\s)name\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE
+)
+_EXTERNAL = re.compile(r"^(?:[a-z][a-z0-9+.-]*:|//)", re.IGNORECASE)
+
+
+def scan_html(html: str) -> dict:
+    """Return the IDs a page defines and its internal link targets.
+
+    Links are ``[line, target]`` pairs; external URLs (any scheme, or
+    protocol-relative) are left out.
+    """
+    newlines = [match.start() for match in re.finditer("\n", html)]
+    links = []
+    for match in _ATTRIBUTE.finditer(html):
+        target = (match.group(2) or match.group(3) or "").strip()
+        if target and not _EXTERNAL.match(target):
+            links.append([bisect_right(newlines, match.start()) + 1, target])
+    ids = sorted(
+        {
+            match.group(1) or match.group(2)
+            for pattern in (_ID, _ANCHOR_NAME)
+            for match in pattern.finditer(html)
+        }
+    )
+    return {"ids": ids, "links": links}
+
+
+def _scan_file(path: str) -> dict:
+    with open(path, "r", encoding="utf-8", errors="replace") as file:
+        return scan_html(file.read())
+
+
+def _output_files(output: str) -> list[str]:
+    files = []
+    for directory, dirnames, filenames in os.walk(output):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            relative = os.path.relpath(os.path.join(directory, filename), output)
+            files.append(relative.replace(os.sep, "/"))
+    return files
+
+
+def scan_cache_path(output: str) -> str:
+    """Return where scans of `output` are cached: a file per output
+    directory under ``$XDG_CACHE_HOME/slartibartfast/links``."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    key = hashlib.sha256(os.path.abspath(output).encode("utf-8")).hexdigest()
+    return os.path.join(cache_home, "slartibartfast", "links", f"{key[:32]}.json")
+
+
+def _load_scan_cache(output: str) -> dict:
+    try:
+        with open(scan_cache_path(output), "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def scan_output(output: str) -> tuple[list[str], dict[str, dict]]:
+    """Return every file in `output` and the scan of each HTML file.
+
+    Unchanged files reuse the previous scan; the rest are scanned in worker
+    processes when there are many of them.
+    """
+    files = _output_files(output)
+    previous = _load_scan_cache(output)
+    scans = {}
+    stale = []
+    for name in files:
+        if not name.endswith(HTML_EXTENSIONS):
+            continue
+        stat = os.stat(os.path.join(output, name))
+        key = [stat.st_mtime_ns, stat.st_size]
+        cached = previous.get(name)
+        if cached is not None and cached["key"] == key:
+            scans[name] = cached
+        else:
+            stale.append((name, key))
+
+    paths = [os.path.join(output, name) for name, _ in stale]
+    if len(paths) >= PROCESS_MIN_FILES:
+        with ProcessPoolExecutor() as executor:
+            results = list(executor.map(_scan_file, paths, chunksize=64))
+    else:
+        results = [_scan_file(path) for path in paths]
+    for (name, key), result in zip(stale, results):
+        scans[name] = dict(result, key=key)
+
+    cache_path = scan_cache_path(output)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, "w") as file:
+            json.dump(scans, file)
+    except OSError:
+        pass
+    return files, scans
+
+
+def _resolve(source: str, target: str, files: set[str]) -> tuple[str | None, str]:
+    """Return the output file `target` points to (None if missing) and its
+    fragment, for a link on page `source`."""
+    url = urlsplit(urljoin(f"/{source}", target))
+    path = unquote(url.path).lstrip("/")
+    if path in files:
+        return path, url.fragment
+    index = f"{path.rstrip('/')}/index.html".lstrip("/")
+    if index in files:
+        return index, url.fragment
+    return None, url.fragment
+
+
+def check_links(output: str) -> list[dict]:
+    """Return the broken internal links in the site built into `output`.
+
+    Each is a dict with the ``source`` page, ``line``, ``target`` and a
+    ``reason``: "missing page" or "missing anchor".
+    """
+    files, scans = scan_output(output)
+    known = set(files)
+    ids = {name: set(scan["ids"]) for name, scan in scans.items()}
+    broken = []
+    for source in sorted(scans):
+        for line, target in scans[source]["links"]:
+            resolved, fragment = _resolve(source, target, known)
+            if resolved is None:
+                reason = "missing page"
+            elif (
+                fragment and resolved in ids and unquote(fragment) not in ids[resolved]
+            ):
+                reason = "missing anchor"
+            else:
+                continue
+            broken.append(
+                {"source": source, "line": line, "target": target, "reason": reason}
+            )
+    return broken
@@ -0,0 +1,152 @@
+"""Counters and histograms in the Prometheus text format.
+
+Each thread records into its own shard (a plain dict only that thread
+writes to), so observing a value takes no lock; a scrape copies and sums
+the shards. A lock is only taken the first time a thread records a value.
+"""
+
+from bisect import bisect_left
+from collections.abc import Callable
+import threading
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Shards:
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: list[dict] = []
+
+    def mine(self) -> dict:
+        """Return the calling thread's shard."""
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            with self._lock:
+                self._shards.append(values)
+            return values
+
+    def totals(self) -> dict:
+        """Sum every shard. Values recorded during the call may be missed."""
+        with self._lock:
+            shards = list(self._shards)
+        totals = {}
+        for shard in shards:
+            for key, value in shard.copy().items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A monotonically increasing count, optionally split by labels."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._shards = _Shards()
+
+    def inc(self, amount: float = 1, labels: tuple = ()) -> None:
+        values = self._shards.mine()
+        values[labels] = values.get(labels, 0) + amount
+
+    def value(self, labels: tuple = ()) -> float:
+        return self._shards.totals().get(labels, 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._shards.totals().items()):
+            lines.append(
+                f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+            )
+        return lines
+
+
+class Histogram:
+    """Observations counted into cumulative buckets, optionally by labels."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DURATION_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._shards = _Shards()
+
+    def observe(self, value: float, labels: tuple = ()) -> None:
+        values = self._shards.mine()
+        bucket = (labels, bisect_left(self.buckets, value))
+        values[bucket] = values.get(bucket, 0) + 1
+        values[labels, "sum"] = values.get((labels, "sum"), 0) + value
+
+    def count(self, labels: tuple = ()) -> int:
+        totals = self._shards.totals()
+        return sum(totals.get((labels, i), 0) for i in range(len(self.buckets)))
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        totals = self._shards.totals()
+        for labels in sorted({labels for labels, _ in totals}):
+            cumulative = 0
+            for i, bound in enumerate(self.buckets):
+                cumulative += totals.get((labels, i), 0)
+                le = _labels(self.labelnames, labels, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            plain = _labels(self.labelnames, labels)
+            total = totals.get((labels, "sum"), 0)
+            lines.append(f"{self.name}_sum{plain} {_number(total)}")
+            lines.append(f"{self.name}_count{plain} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """A value read from `function` at scrape time."""
+
+    def __init__(self, name: str, help: str, function: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.function = function
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {_number(self.function())}",
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Counter | Histogram | Gauge] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,453 @@
+"""Where a build's files go: a directory, or straight into an archive.
+
+The generator hands every file it produces to an output writer instead of
+opening files itself. `DirectoryOutput` writes into a directory, as builds
+always have; `WriteBehindOutput` does so from background threads, so
+rendering doesn't wait for the disk. `ArchiveOutput` writes a tar
+(optionally gzip or zstd compressed) or zip archive without touching the
+output directory.
+"""
+
+from abc import ABC, abstractmethod
+import gzip
+import hashlib
+import io
+import json
+import os
+import queue
+import shutil
+import tarfile
+import threading
+import time
+import zipfile
+
+from . import config
+from .cache import MANIFEST_VERSION, load_manifest, save_manifest
+
+# Write-behind output: writer threads, how many bytes may wait in the queue
+# before write() blocks, and how many bytes a writer takes from it at once.
+WRITE_THREADS = 2
+MAX_PENDING_BYTES = 32 * 1024 * 1024
+WRITE_BATCH_BYTES = 256 * 1024
+# Archive timestamps: $SOURCE_DATE_EPOCH, or 1980-01-01, the earliest date a
+# zip entry can carry.
+DEFAULT_ARCHIVE_EPOCH = 315532800
+
+
+def archive_format(path: str) -> str | None:
+    """Return the archive format implied by `path`'s suffix, if any."""
+    for suffix, archive_type in config.ARCHIVE_SUFFIXES.items():
+        if path.endswith(suffix):
+            return archive_type
+    return None
+
+
+def file_digest(path: str) -> str:
+    """Return the sha1 digest of a file's bytes."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _as_bytes(data: str | bytes) -> bytes:
+    return data.encode("utf-8") if isinstance(data, str) else data
+
+
+class OutputWriter(ABC):
+    """Receives the files of one build, addressed by output-relative names.
+
+    Subclasses implement every abstract method; `flush` and `close` default
+    to doing nothing.
+    """
+
+    @abstractmethod
+    def write(self, name: str, data: str | bytes, only_if_changed=False) -> bool:
+        """Store `data` as `name`; return False if it was left as it was."""
+
+    @abstractmethod
+    def copy(self, source: str, name: str) -> None:
+        """Store the file at `source` as `name`."""
+
+    @abstractmethod
+    def copy_tree(self, source: str, name: str) -> None:
+        """Store the directory `source` as `name`, replacing what was there."""
+
+    @abstractmethod
+    def exists(self, name: str) -> bool:
+        """Whether the previous build's `name` is still in place."""
+
+    @abstractmethod
+    def load_manifest(self) -> dict:
+        """Return the previous build's manifest (see `cache.load_manifest`)."""
+
+    @abstractmethod
+    def save_manifest(self, manifest: dict) -> None:
+        """Record this build's manifest."""
+
+    def flush(self) -> dict[str, Exception]:
+        """Wait for pending writes; return the errors of any that failed."""
+        return {}
+
+    def close(self) -> None:
+        """Finish the output."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if exc_info[0] is None:
+            self.close()
+
+
+class DirectoryOutput(OutputWriter):
+    """Writes a build into a directory, keeping files from earlier builds."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def write(self, name: str, data: str | bytes, only_if_changed=False) -> bool:
+        path = self._path(name)
+        data = _as_bytes(data)
+        if only_if_changed:
+            try:
+                with open(path, "rb") as file:
+                    if file.read() == data:
+                        return False
+            except FileNotFoundError:
+                pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(data)
+        return True
+
+    def copy(self, source: str, name: str) -> None:
+        shutil.copy2(source, self._path(name))
+
+    def copy_tree(self, source: str, name: str) -> None:
+        target = self._path(name)
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        shutil.copytree(source, target)
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(self._path(name))
+
+    def load_manifest(self) -> dict:
+        return load_manifest(self.path)
+
+    def save_manifest(self, manifest: dict) -> None:
+        save_manifest(self.path, manifest)
+
+
+class WriteBehindOutput(DirectoryOutput):
+    """A DirectoryOutput whose `write()` queues the file and returns at once.
+
+    Writer threads drain the queue, taking several small files per batch and
+    creating each directory only once. When more than `max_pending_bytes`
+    are queued, `write()` blocks until the writers catch up. A failed write
+    is reported by `flush()` rather than by `write()`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        threads: int = WRITE_THREADS,
+        max_pending_bytes: int = MAX_PENDING_BYTES,
+        batch_bytes: int = WRITE_BATCH_BYTES,
+    ):
+        super().__init__(path)
+        self.threads = max(threads, 1)
+        self.max_pending_bytes = max_pending_bytes
+        self.batch_bytes = batch_bytes
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._pending = 0
+        self._unfinished = 0
+        self._condition = threading.Condition()
+        self._created_dirs: set[str] = {os.path.abspath(path)}
+        self._errors: dict[str, Exception] = {}
+        self._workers: list[threading.Thread] = []
+
+    def write(self, name: str, data: str | bytes, only_if_changed=False) -> bool:
+        if only_if_changed:
+            # The caller needs to know whether it changed
+            return super().write(name, data, only_if_changed)
+        data = _as_bytes(data)
+        with self._condition:
+            # Back-pressure, but always let a lone oversized file through
+            while self._pending and self._pending + len(data) > self.max_pending_bytes:
+                self._condition.wait()
+            self._pending += len(data)
+            self._unfinished += 1
+            if len(self._workers) < self.threads:
+                self._start_worker()
+        self._queue.put((name, data))
+        return True
+
+    def _start_worker(self) -> None:
+        worker = threading.Thread(target=self._drain, daemon=True)
+        self._workers.append(worker)
+        worker.start()
+
+    def _drain(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch, size = [item], len(item[1])
+            while size < self.batch_bytes:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    # Hand the stop signal on once this batch is written
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+                size += len(item[1])
+            for name, data in batch:
+                self._write_file(name, data)
+            with self._condition:
+                self._pending -= size
+                self._unfinished -= len(batch)
+                self._condition.notify_all()
+
+    def _write_file(self, name: str, data: bytes) -> None:
+        path = self._path(name)
+        try:
+            directory = os.path.dirname(os.path.abspath(path))
+            if directory not in self._created_dirs:
+                os.makedirs(directory, exist_ok=True)
+                self._created_dirs.add(directory)
+            with open(path, "wb") as file:
+                file.write(data)
+        except Exception as e:
+            self._errors[name] = e
+
+    def flush(self) -> dict[str, Exception]:
+        with self._condition:
+            while self._unfinished:
+                self._condition.wait()
+        errors, self._errors = self._errors, {}
+        return errors
+
+    def close(self) -> None:
+        self.flush()
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def __exit__(self, *exc_info):
+        # Always finish queued writes and stop the writer threads
+        self.close()
+
+
+def as_writer(output) -> OutputWriter:
+    """Return `output` if it is a writer, else a DirectoryOutput for the path."""
+    return output if isinstance(output, OutputWriter) else DirectoryOutput(output)
+
+
+def _read_previous_manifest(since: str | None) -> dict:
+    """Load a manifest from a JSON file or from an archive made by this module."""
+    empty = {"version": MANIFEST_VERSION, "pages": {}, "files": {}}
+    if since is None:
+        return empty
+    if archive_format(since) is None:
+        with open(since, "rb") as file:
+            data = file.read()
+    elif archive_format(since) == "zip":
+        with zipfile.ZipFile(since) as archive:
+            data = archive.read(config.MANIFEST_FILENAME)
+    else:
+        with _open_tar(since, "r", archive_format(since)) as archive:
+            for info in archive:
+                if info.name == config.MANIFEST_FILENAME:
+                    data = archive.extractfile(info).read()
+                    break
+            else:
+                raise KeyError(f"No {config.MANIFEST_FILENAME} in {since}")
+    manifest = json.loads(data)
+    if manifest.get("version") != MANIFEST_VERSION:
+        return empty
+    manifest.setdefault("files", {})
+    return manifest
+
+
+def _zstd():
+    """Return a module providing zstd streams, or raise if none is installed."""
+    try:
+        from compression import zstd  # Python 3.14+
+    except ImportError:
+        try:
+            import zstandard as zstd
+        except ImportError:
+            raise RuntimeError(
+                "Writing .tar.zst archives needs Python 3.14+ or `zstandard`"
+            ) from None
+    return zstd
+
+
+def _open_tar(path: str, mode: str, archive_type: str) -> tarfile.TarFile:
+    """Open a tar archive of any supported compression for reading or writing."""
+    if archive_type == "tar":
+        return tarfile.open(path, mode)
+    raw = open(path, mode + "b")
+    if archive_type == "gztar":
+        # No file name and a fixed timestamp in the gzip header keep the
+        # output stable
+        stream = gzip.GzipFile(filename="", mode=mode + "b", fileobj=raw, mtime=0)
+    else:
+        stream = _zstd().open(raw, mode + "b")
+    archive = tarfile.open(fileobj=stream, mode=mode + "|")
+    # Closing a TarFile doesn't close the streams it was handed
+    close = archive.close
+
+    def close_all():
+        close()
+        stream.close()
+        raw.close()
+
+    archive.close = close_all
+    return archive
+
+
+class ArchiveOutput(OutputWriter):
+    """Writes a build into a single archive file.
+
+    Members are written in sorted order with fixed timestamps, owners and
+    permissions, so the same build produces a byte-identical archive.
+    Rendered files are held in memory until `close()`; copied files are
+    streamed from their source then.
+
+    With a previous build's manifest (`since`, a JSON manifest or an archive
+    made by this class) only files that changed are added, and pages whose
+    inputs are unchanged aren't rendered at all. Every archive carries the
+    manifest of the complete build, listing each file's digest, plus the
+    names of files ``removed`` since the previous build.
+    """
+
+    def __init__(self, path: str, since: str | None = None):
+        self.path = path
+        self.format = archive_format(path)
+        if self.format is None:
+            raise ValueError(f"Not an archive name: {path}")
+        if self.format == "zstdtar":
+            _zstd()
+        self.previous = _read_previous_manifest(since)
+        self.files: dict[str, str] = {}
+        self.written = 0
+        self._members: dict[str, tuple[str, object]] = {}
+        self._manifest = {"version": MANIFEST_VERSION, "pages": {}}
+        self._lock = threading.Lock()
+        self.epoch = int(os.environ.get("SOURCE_DATE_EPOCH", DEFAULT_ARCHIVE_EPOCH))
+
+    def _add(self, name: str, digest: str, member: tuple[str, object]) -> bool:
+        name = name.replace(os.sep, "/")
+        with self._lock:
+            self.files[name] = digest
+            if self.previous["files"].get(name) == digest:
+                self._members.pop(name, None)
+                return False
+            self._members[name] = member
+            return True
+
+    def write(self, name: str, data: str | bytes, only_if_changed=False) -> bool:
+        data = _as_bytes(data)
+        return self._add(name, hashlib.sha1(data).hexdigest(), ("data", data))
+
+    def copy(self, source: str, name: str) -> None:
+        self._add(name, file_digest(source), ("file", source))
+
+    def copy_tree(self, source: str, name: str) -> None:
+        # Like a directory build, drop what an earlier copy put under `name`
+        prefix = os.path.normpath(name).replace(os.sep, "/") + "/"
+        with self._lock:
+            for stale in [key for key in self.files if key.startswith(prefix)]:
+                del self.files[stale]
+                self._members.pop(stale, None)
+        for directory, dirnames, filenames in os.walk(source):
+            dirnames.sort()
+            relative = os.path.relpath(directory, source)
+            for filename in sorted(filenames):
+                self.copy(
+                    os.path.join(directory, filename),
+                    os.path.normpath(os.path.join(name, relative, filename)),
+                )
+
+    def exists(self, name: str) -> bool:
+        return name.replace(os.sep, "/") in self.previous["files"]
+
+    def load_manifest(self) -> dict:
+        return {"version": self.previous["version"], "pages": self.previous["pages"]}
+
+    def save_manifest(self, manifest: dict) -> None:
+        self._manifest = manifest
+
+    def close(self) -> None:
+        # Pages that weren't rendered again keep their previous digest
+        for name in self._manifest["pages"]:
+            if name not in self.files and name in self.previous["files"]:
+                self.files[name] = self.previous["files"][name]
+        manifest = dict(
+            self._manifest,
+            files=self.files,
+            removed=sorted(set(self.previous["files"]) - set(self.files)),
+        )
+        self._members[config.MANIFEST_FILENAME] = (
+            "data",
+            json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"),
+        )
+
+        partial = f"{self.path}.partial"
+        if self.format == "zip":
+            self._write_zip(partial)
+        else:
+            self._write_tar(partial)
+        os.replace(partial, self.path)
+        self.written = len(self._members) - 1
+
+    def _write_tar(self, path: str) -> None:
+        with _open_tar(path, "w", self.format) as archive:
+            for name in sorted(self._members):
+                kind, payload = self._members[name]
+                info = tarfile.TarInfo(name)
+                info.mtime = self.epoch
+                info.mode = 0o644
+                if kind == "data":
+                    info.size = len(payload)
+                    archive.addfile(info, io.BytesIO(payload))
+                else:
+                    info.size = os.path.getsize(payload)
+                    with open(payload, "rb") as file:
+                        archive.addfile(info, file)
+
+    def _write_zip(self, path: str) -> None:
+        timestamp = time.gmtime(self.epoch)[:6]
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name in sorted(self._members):
+                kind, payload = self._members[name]
+                info = zipfile.ZipInfo(name, date_time=timestamp)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.external_attr = 0o644 << 16
+                if kind == "data":
+                    archive.writestr(info, payload)
+                else:
+                    with open(payload, "rb") as source, archive.open(info, "w") as file:
+                        shutil.copyfileobj(source, file)
+
+
+def open_output(output: str, since: str | None = None) -> OutputWriter:
+    """Return an ArchiveOutput for archive names, else a WriteBehindOutput."""
+    if archive_format(output) is not None:
+        return ArchiveOutput(output, since)
+    if since is not None:
+        raise ValueError("Building only changed files needs an archive output")
+    return WriteBehindOutput(output)
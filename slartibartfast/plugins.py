@@ -0,0 +1,138 @@
+from contextlib import nullcontext
+import hashlib
+from importlib import import_module
+import sys
+import threading
+import time
+from types import ModuleType
+
+# Hooks called by generate_site, in build order:
+#
+# - on_pages_collected(pages, config): after content is scanned, before
+#   taxonomies, navigation and feeds are derived. Plugins may edit `pages`.
+# - on_page_rendered(page, html, config): after a page's template is
+#   rendered. Returning a string replaces the page's HTML. Only called for
+#   pages the build re-renders.
+# - on_page_unchanged(page, config): instead of on_page_rendered, for pages
+#   whose output from a previous build is kept as it is.
+# - on_build_finished(stats, config, output): after everything is written.
+HOOKS = (
+    "on_pages_collected",
+    "on_page_rendered",
+    "on_page_unchanged",
+    "on_build_finished",
+)
+
+
+def load_plugin(spec: str):
+    """Import a plugin from "package.module" or "package.module:attribute".
+
+    A module is used as the plugin itself (its functions are the hooks); a
+    class named by the attribute is instantiated without arguments.
+    """
+    module_name, _, attribute = spec.partition(":")
+    plugin = import_module(module_name)
+    if attribute:
+        plugin = getattr(plugin, attribute)
+        if isinstance(plugin, type):
+            plugin = plugin()
+    return plugin
+
+
+def plugin_name(plugin) -> str:
+    """Return a plugin's `name`, falling back to its module or class name."""
+    name = getattr(plugin, "name", None)
+    if name:
+        return name
+    if isinstance(plugin, ModuleType):
+        return plugin.__name__
+    return type(plugin).__name__
+
+
+def plugin_signature(plugin, config: dict) -> list:
+    """Return what identifies a plugin's effect on pages, for fingerprints.
+
+    That is its name, its `version` attribute (or its module's
+    ``__version__``), its `options` attribute, its block in the site config
+    (under its name) and a digest of its module's source file, so editing a
+    local plugin also invalidates the pages it rendered.
+    """
+    if isinstance(plugin, ModuleType):
+        module = plugin
+    else:
+        module = sys.modules.get(type(plugin).__module__)
+    version = getattr(plugin, "version", None) or getattr(module, "__version__", None)
+    source_digest = None
+    source = getattr(module, "__file__", None)
+    if source:
+        try:
+            with open(source, "rb") as file:
+                source_digest = hashlib.sha256(file.read()).hexdigest()
+        except OSError:
+            pass
+    name = plugin_name(plugin)
+    return [
+        name,
+        version,
+        getattr(plugin, "options", None),
+        config.get(name),
+        source_digest,
+    ]
+
+
+class PluginManager:
+    """Dispatches build hooks to plugins and times every invocation.
+
+    Plugins are modules or objects implementing any of HOOKS. Hooks may be
+    called from render worker threads; a plugin that sets
+    ``parallel_safe = True`` runs there concurrently, all others run one
+    call at a time behind a lock.
+    """
+
+    def __init__(self, plugins: list | None = None):
+        self.plugins = list(plugins or [])
+        self.timings: dict[str, dict] = {}
+        self._serial = threading.Lock()
+        self._timings_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict, plugins: list | None = None):
+        """Load the plugins listed under `plugins` in the site config."""
+        loaded = [load_plugin(spec) for spec in config.get("plugins", [])]
+        return cls(loaded + list(plugins or []))
+
+    def _invoke(self, plugin, hook: str, kwargs: dict):
+        function = getattr(plugin, hook, None)
+        if function is None:
+            return None
+        parallel_safe = getattr(plugin, "parallel_safe", False)
+        with nullcontext() if parallel_safe else self._serial:
+            # Time the hook itself, not the wait for the lock
+            start = time.perf_counter()
+            try:
+                return function(**kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                self._record(f"{plugin_name(plugin)}.{hook}", elapsed)
+
+    def _record(self, key: str, elapsed: float) -> None:
+        with self._timings_lock:
+            timing = self.timings.setdefault(key, {"calls": 0, "seconds": 0.0})
+            timing["calls"] += 1
+            timing["seconds"] += elapsed
+
+    def call(self, hook: str, **kwargs) -> None:
+        """Call `hook` on every plugin that implements it."""
+        for plugin in self.plugins:
+            self._invoke(plugin, hook, kwargs)
+
+    def filter(self, hook: str, key: str, value, **kwargs):
+        """Call `hook` on every plugin, threading `value` through as `key`.
+
+        A plugin returning None leaves the value unchanged.
+        """
+        for plugin in self.plugins:
+            result = self._invoke(plugin, hook, {key: value, **kwargs})
+            if result is not None:
+                value = result
+        return value
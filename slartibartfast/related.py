@@ -0,0 +1,154 @@
+from functools import cache
+import heapq
+import math
+
+DEFAULT_RELATED_LIMIT = 5
+# Below this many posts importing NumPy costs more than it saves.
+NUMPY_MIN_PAGES = 256
+# Rows of the similarity matrix computed at once by the NumPy path, which
+# keeps memory at O(chunk * pages) instead of O(pages²).
+_CHUNK_ROWS = 512
+
+
+@cache
+def _numpy():
+    """Return the numpy module, or None when NumPy isn't installed."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _summary(page: dict) -> dict:
+    """The subset of a page's metadata that links to it need."""
+    return {
+        "url": page["url"],
+        "title": page["title"],
+        "date": page.get("date"),
+        "description": page.get("description", ""),
+    }
+
+
+def _is_post(page: dict) -> bool:
+    return "pages" not in page and "taxonomy" not in page
+
+
+def build_section_index(pages_metadata: list[dict]) -> dict[str, dict]:
+    """Map each section post's URL to its previous and next posts.
+
+    Each section's posts are sorted by date once, so looking up a page's
+    neighbours is O(1). "Previous" is the older post, "next" the newer one.
+    """
+    index = {}
+    for section in pages_metadata:
+        if "pages" not in section or "taxonomy" in section:
+            continue
+        posts = sorted(
+            (page for page in section["pages"] if _is_post(page)),
+            key=lambda page: (str(page.get("date", "")), page["url"]),
+        )
+        for position, page in enumerate(posts):
+            index[page["url"]] = {
+                "prev": _summary(posts[position - 1]) if position > 0 else None,
+                "next": (
+                    _summary(posts[position + 1]) if position + 1 < len(posts) else None
+                ),
+            }
+    return index
+
+
+def _top_k(scores: dict[int, float], limit: int) -> list[tuple[float, int]]:
+    """Highest scores first; ties go to the page listed first (the newest)."""
+    return heapq.nsmallest(
+        limit, ((-score, other) for other, score in scores.items() if score > 0)
+    )
+
+
+def _related_python(terms: list[set[str]], limit: int) -> list[list[tuple]]:
+    """Cosine similarity over tag sets using an inverted index."""
+    postings: dict[str, list[int]] = {}
+    for position, page_terms in enumerate(terms):
+        for term in page_terms:
+            postings.setdefault(term, []).append(position)
+
+    results = []
+    for position, page_terms in enumerate(terms):
+        shared: dict[int, int] = {}
+        for term in page_terms:
+            for other in postings[term]:
+                if other != position:
+                    shared[other] = shared.get(other, 0) + 1
+        scores = {
+            other: count / math.sqrt(len(page_terms) * len(terms[other]))
+            for other, count in shared.items()
+        }
+        results.append(_top_k(scores, limit))
+    return results
+
+
+def _related_numpy(terms: list[set[str]], limit: int) -> list[list[tuple]]:
+    """Cosine similarity over tag sets as chunked matrix products."""
+    np = _numpy()
+    vocabulary = {
+        term: column for column, term in enumerate(sorted(set().union(*terms)))
+    }
+    matrix = np.zeros((len(terms), len(vocabulary)), dtype=np.int32)
+    for row, page_terms in enumerate(terms):
+        matrix[row, [vocabulary[term] for term in page_terms]] = 1
+    sizes = matrix.sum(axis=1)
+
+    results = []
+    for start in range(0, len(terms), _CHUNK_ROWS):
+        chunk = slice(start, start + _CHUNK_ROWS)
+        # Integer co-occurrence counts are exact; the division matches the
+        # pure-Python path bit for bit so both rank pages identically.
+        shared = matrix[chunk] @ matrix.T
+        norms = np.sqrt((sizes[chunk, None] * sizes[None, :]).astype(np.float64))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = np.where(shared > 0, shared / norms, 0.0)
+        for offset, row in enumerate(scores):
+            row[start + offset] = 0.0
+            candidates = np.flatnonzero(row > 0)
+            if len(candidates) > limit:
+                threshold = np.partition(row[candidates], -limit)[-limit]
+                candidates = candidates[row[candidates] >= threshold]
+            results.append(
+                _top_k({int(other): float(row[other]) for other in candidates}, limit)
+            )
+    return results
+
+
+def related_pages(
+    pages_metadata: list[dict],
+    terms_of,
+    limit: int = DEFAULT_RELATED_LIMIT,
+) -> dict[str, list[dict]]:
+    """Map each post's URL to its most similar posts by shared terms.
+
+    Pages are compared by the cosine similarity of their term sets (as
+    returned by ``terms_of(page)``, e.g. their tags). For large sites with
+    NumPy installed the whole corpus is scored with vectorized matrix
+    products; otherwise an inverted index gives the same ranking in pure
+    Python.
+    """
+    # Newest first, so equally similar pages rank newer ones higher and the
+    # result doesn't depend on the order pages were scanned in.
+    posts = sorted(
+        (page for page in pages_metadata if _is_post(page)),
+        key=lambda page: (str(page.get("date", "")), page["url"]),
+        reverse=True,
+    )
+    terms = [set(terms_of(page)) for page in posts]
+    if not any(terms) or limit <= 0:
+        return {}
+
+    use_numpy = len(posts) >= NUMPY_MIN_PAGES and _numpy() is not None
+    compute = _related_numpy if use_numpy else _related_python
+    return {
+        page["url"]: [
+            dict(_summary(posts[other]), score=-negated) for negated, other in ranked
+        ]
+        for page, ranked in zip(posts, compute(terms, limit))
+        if ranked
+    }
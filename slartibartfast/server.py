@@ -1,28 +1,214 @@
+from datetime import date, datetime
 from functools import partial
 import http.server
 import os
 import socketserver
+import threading
+import time
 
 import typer
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
 
-from .generator import generate_site
+from .cache import load_manifest
+from .generator import generate_site, published_since
+from .metrics import CONTENT_TYPE, Counter, Gauge, Histogram, Registry
+
+METRICS_PATH = "/__metrics"
+PAGE_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class ServeMetrics:
+    """What `slarti serve` exposes at /__metrics.
+
+    `event_queue_depth` returns the number of file events waiting to be
+    handled; it is read at scrape time.
+    """
+
+    def __init__(self, event_queue_depth=lambda: 0):
+        self.registry = Registry()
+        self.requests = self.registry.register(
+            Histogram(
+                "slarti_http_request_duration_seconds",
+                "Time spent handling HTTP requests, by response status.",
+                ("status",),
+            )
+        )
+        self.bytes_sent = self.registry.register(
+            Counter("slarti_http_response_bytes_total", "Bytes sent to clients.")
+        )
+        self.rebuilds = self.registry.register(
+            Histogram(
+                "slarti_rebuild_duration_seconds",
+                "Time spent rebuilding the site, by what triggered the rebuild.",
+                ("trigger",),
+            )
+        )
+        self.rebuild_errors = self.registry.register(
+            Counter(
+                "slarti_rebuild_failures_total",
+                "Rebuilds that raised instead of finishing.",
+                ("trigger",),
+            )
+        )
+        self.pages_rebuilt = self.registry.register(
+            Histogram(
+                "slarti_rebuild_pages",
+                "Pages rendered per rebuild.",
+                buckets=PAGE_BUCKETS,
+            )
+        )
+        self.pages_unchanged = self.registry.register(
+            Counter(
+                "slarti_rebuild_pages_unchanged_total",
+                "Pages a rebuild skipped because their output was up to date.",
+            )
+        )
+        self.registry.register(
+            Gauge(
+                "slarti_file_events_pending",
+                "File change events waiting to be handled.",
+                event_queue_depth,
+            )
+        )
+
+    def record_rebuild(self, trigger: str, seconds: float, stats: dict | None):
+        self.rebuilds.observe(seconds, (trigger,))
+        if stats:
+            self.pages_rebuilt.observe(stats.get("pages", 0))
+            self.pages_unchanged.inc(stats.get("unchanged", 0))
+
+
+class _CountingWriter:
+    """Wraps a request's output stream, counting the bytes written to it."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.written = 0
+
+    def write(self, data) -> int:
+        self.written += len(data)
+        return self.stream.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+class MetricsRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Serves the output directory, recording each request in `metrics`."""
+
+    def __init__(self, *args, metrics: ServeMetrics, **kwargs):
+        self.metrics = metrics
+        super().__init__(*args, **kwargs)
+
+    def setup(self):
+        super().setup()
+        self.wfile = _CountingWriter(self.wfile)
+
+    def handle_one_request(self):
+        self.status = None
+        start = time.perf_counter()
+        super().handle_one_request()
+        if self.status is not None:
+            self.metrics.requests.observe(
+                time.perf_counter() - start, (str(self.status),)
+            )
+        self.metrics.bytes_sent.inc(self.wfile.written)
+        self.wfile.written = 0
+
+    def send_response_only(self, code, message=None):
+        self.status = code
+        super().send_response_only(code, message)
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != METRICS_PATH:
+            return super().do_GET()
+        body = self.metrics.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class PublishScheduler:
+    """Rebuilds the pages that scheduled posts affect when they're due.
+
+    Every build records the next `publish_date` of a held-back page in its
+    manifest; after each build, a timer is set for midnight of that day.
+    Builds (by the timer or the file watcher) are serialized by `lock`, and
+    recorded in `metrics` if given.
+    """
+
+    def __init__(self, path: str, output: str, metrics: ServeMetrics | None = None):
+        self.path = path
+        self.output = output
+        self.metrics = metrics
+        self.lock = threading.Lock()
+        self.timer: threading.Timer | None = None
+
+    def _build(self, trigger: str, only=None) -> None:
+        start = time.perf_counter()
+        try:
+            stats = generate_site(self.path, self.output, only=only)
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.rebuild_errors.inc(labels=(trigger,))
+            raise
+        if self.metrics is not None:
+            self.metrics.record_rebuild(trigger, time.perf_counter() - start, stats)
+
+    def schedule(self) -> None:
+        """Set the timer for the next publish date in the output's manifest."""
+        self.cancel()
+        next_publish = load_manifest(self.output).get("next_publish")
+        if not next_publish:
+            return
+        due = datetime.combine(date.fromisoformat(next_publish), datetime.min.time())
+        delay = (due - datetime.now()).total_seconds()
+        # Timers can't wait arbitrarily long; an early wake-up just reschedules
+        delay = min(max(delay, 0), threading.TIMEOUT_MAX)
+        self.timer = threading.Timer(delay, self.publish)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def publish(self) -> None:
+        """Rebuild the pages affected by scheduled pages that are now due."""
+        with self.lock:
+            select = published_since(load_manifest(self.output))
+            if select is not None:
+                typer.echo("Scheduled pages are due, regenerating affected pages...")
+                self._build("schedule", only=select)
+        self.schedule()
+
+    def rebuild(self) -> None:
+        """Rebuild the whole site, then reschedule."""
+        with self.lock:
+            self._build("change")
+        self.schedule()
+
+    def cancel(self) -> None:
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
 
 
 class ReloadEventHandler(FileSystemEventHandler):
-    def __init__(self, path: str, output: str):
+    def __init__(
+        self, path: str, output: str, scheduler: PublishScheduler | None = None
+    ):
         super().__init__()
         self.path = path
         self.output = output
+        self.scheduler = scheduler or PublishScheduler(path, output)
 
     def on_modified(self, event):
         typer.echo(f"Detected change in {event.src_path}, regenerating site...")
-        generate_site(self.path, self.output)
+        self.scheduler.rebuild()
 
     def on_created(self, event):
         typer.echo(f"Detected new file {event.src_path}, regenerating site...")
-        generate_site(self.path, self.output)
+        self.scheduler.rebuild()
 
 
 def serve(path: str, output: str = "_build", port: int = 8000):
@@ -32,15 +218,21 @@ def serve(path: str, output: str = "_build", port: int = 8000):
         typer.echo(f"Error: '{path}' is not a directory")
         raise typer.Exit(code=1)
 
-    event_handler = ReloadEventHandler(path, output)
     observer = Observer()
+    metrics = ServeMetrics(observer.event_queue.qsize)
+    scheduler = PublishScheduler(path, output, metrics)
+    scheduler.schedule()
+    event_handler = ReloadEventHandler(path, output, scheduler)
     observer.schedule(event_handler, path, recursive=True)
     observer.start()
-    handler = partial(http.server.SimpleHTTPRequestHandler, directory=output)
+    handler = partial(MetricsRequestHandler, directory=output, metrics=metrics)
     with socketserver.TCPServer(("", port), handler) as httpd:
         typer.echo(f"Serving static site at http://localhost:{port} from {output}")
+        typer.echo(f"Metrics at http://localhost:{port}{METRICS_PATH}")
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
             typer.echo("Shutting down server...")
             httpd.shutdown()
+        finally:
+            scheduler.cancel()
@@ -6,9 +6,13 @@ the package hasn't been installed into the current Python environment.
 Prefer installing the package into the virtualenv (see README) for CI/normal use.
 """
 
+import os
 from pathlib import Path
 import sys
 
+import pytest
+import yaml
+
 
 def _add_repo_root_to_path() -> None:
     # tests/ is at repo_root/tests; add repo_root to sys.path so
@@ -20,3 +24,43 @@ def _add_repo_root_to_path() -> None:
 
 
 _add_repo_root_to_path()
+
+
+@pytest.fixture
+def make_site(tmp_path):
+    """Return a function that writes a site's source tree and returns its path.
+
+    ``make_site(config, files, pages)`` writes `config`, over ``theme:
+    minimal``, to ``_config.yaml``; each of `files` (a path relative to the
+    site) as UTF-8 text, bytes, or YAML if it is a dict; and each name in
+    `pages` as a published ``<name>.md`` titled by its last segment, with
+    the body ``<name> body``. `mtime` sets every file's modification time.
+    The site is ``tmp_path/site`` unless `root` or `name` say otherwise.
+    """
+
+    def make(config=None, files=None, pages=(), root=None, name="site", mtime=None):
+        src = (root or tmp_path) / name
+        src.mkdir(parents=True)
+        files = {
+            "_config.yaml": {"theme": "minimal", **(config or {})},
+            **{
+                f"{page}.md": f"---\ntitle: {page.rsplit('/', 1)[-1]}\n"
+                f"published: true\n---\n{page} body"
+                for page in pages
+            },
+            **(files or {}),
+        }
+        for filename, content in files.items():
+            path = src / filename
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if isinstance(content, bytes):
+                path.write_bytes(content)
+            elif isinstance(content, dict):
+                path.write_text(yaml.safe_dump(content), encoding="utf-8")
+            else:
+                path.write_text(content, encoding="utf-8")
+            if mtime is not None:
+                os.utime(path, (mtime, mtime))
+        return src
+
+    return make
@@ -0,0 +1,112 @@
+import pytest
+from typer.testing import CliRunner
+
+from slartibartfast import batch, cli
+from slartibartfast.cache import BuildCache
+
+
+def test_find_sites_expands_globs_and_skips_non_sites(tmp_path, make_site):
+    make_site(pages=["index"], root=tmp_path / "sites", name="b")
+    make_site(pages=["index"], root=tmp_path / "sites", name="a")
+    (tmp_path / "sites" / "notes").mkdir()
+
+    sites = batch.find_sites(
+        [str(tmp_path / "sites" / "*"), str(tmp_path / "sites" / "a")]
+    )
+
+    assert sites == [str(tmp_path / "sites" / "a"), str(tmp_path / "sites" / "b")]
+
+
+def test_site_outputs_rejects_clashing_names(tmp_path):
+    with pytest.raises(ValueError, match="Several sites"):
+        batch.site_outputs(
+            [str(tmp_path / "x" / "blog"), str(tmp_path / "blog")], "out"
+        )
+
+
+def test_build_sites_shares_one_cache(tmp_path, make_site):
+    sites = [
+        str(make_site(pages=["index", "about"], name="one")),
+        str(make_site({"theme": "default"}, pages=["index"], name="two")),
+        str(make_site(pages=["index"], name="three")),
+    ]
+    cache = BuildCache()
+    out = tmp_path / "out"
+
+    results = batch.build_sites(sites, str(out), cache=cache)
+
+    assert [result["site"] for result in results] == sites
+    assert [result["stats"]["pages"] for result in results] == [2, 1, 1]
+    assert "about body" in (out / "one" / "about.html").read_text(encoding="utf-8")
+    assert "index body" in (out / "three" / "index.html").read_text(encoding="utf-8")
+    # One environment per theme, not per site
+    assert len(cache.environments) == 2
+    summary = batch.summarize(results, 2.0)
+    assert summary["sites"] == 3
+    assert summary["pages"] == 4
+    assert summary["pages_per_second"] == 2.0
+
+
+def test_build_sites_reports_failures_without_stopping(tmp_path, make_site):
+    broken = make_site(pages=["index"], name="broken")
+    (broken / "_config.yaml").write_text("- not a mapping\n", encoding="utf-8")
+    good = make_site(pages=["index"], name="good")
+
+    results = batch.build_sites(
+        [str(broken), str(good)], str(tmp_path / "out"), cache=BuildCache()
+    )
+
+    assert results[0]["stats"] is None
+    assert results[0]["error"].startswith("TypeError")
+    assert results[1]["stats"]["pages"] == 1
+    assert batch.summarize(results, 1.0)["failed"] == 1
+
+
+def test_build_sites_with_worker_processes(tmp_path, make_site):
+    sites = [str(make_site(pages=["index"], name=name)) for name in ("a", "b", "c")]
+
+    results = batch.build_sites(sites, str(tmp_path / "out"), workers=2)
+
+    assert [result["stats"]["pages"] for result in results] == [1, 1, 1]
+    assert (tmp_path / "out" / "c" / "index.html").exists()
+
+
+def test_generate_many_command_reports_each_site(tmp_path, make_site):
+    make_site(pages=["index"], root=tmp_path / "sites", name="a")
+    make_site(pages=["index", "more"], root=tmp_path / "sites", name="b")
+
+    result = CliRunner().invoke(
+        cli.app,
+        [
+            "generate-many",
+            str(tmp_path / "sites" / "*"),
+            "--output",
+            str(tmp_path / "out"),
+        ],
+    )
+
+    assert result.exit_code == 0, result.stdout
+    assert "a: 1 pages" in result.stdout
+    assert "b: 2 pages" in result.stdout
+    assert "Built 2/2 sites: 3 pages" in result.stdout
+
+
+def test_generate_many_command_prints_the_log_of_sites_with_errors(tmp_path, make_site):
+    make_site(pages=["index"], root=tmp_path / "sites", name="a")
+    make_site(
+        {"title": "b"},
+        {"index.md": "---\npublished: true\ntemplate: missing.html\n---\nB"},
+        root=tmp_path / "sites",
+        name="b",
+    )
+
+    result = CliRunner().invoke(
+        cli.app,
+        ["generate-many", str(tmp_path / "sites" / "*"), "--output", str(tmp_path)],
+    )
+
+    lines = result.stdout.splitlines()
+    assert "b: 0 pages rendered, 0 unchanged, 1 errors" in lines[2]
+    assert lines[3].startswith("  Error processing index.md: Template 'missing.html'")
+    # Logs of sites that built cleanly stay quiet
+    assert [line for line in lines if line.startswith("  ")] == [lines[3]]
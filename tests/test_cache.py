@@ -0,0 +1,164 @@
+from datetime import date
+import io
+import tarfile
+
+import jinja2
+import pytest
+from typer.testing import CliRunner
+
+from slartibartfast import cli, generator
+from slartibartfast.cache import (
+    BuildCache,
+    CacheArchiveError,
+    export_archive,
+    import_archive,
+)
+from slartibartfast.config import MANIFEST_FILENAME
+
+PAGES = {
+    f"{name}.md": f"---\ntitle: {name}\ndate: 2024-01-02\npublished: true\n---\n"
+    f"# {name}\n\nBody of {name}"
+    for name in ("a", "b")
+}
+
+
+class ExclaimPlugin:
+    def on_pages_collected(self, pages, config):
+        for page in pages:
+            page["config"]["title"] = page["config"]["title"] + "!"
+
+
+def test_warm_builds_do_not_keep_changes_hooks_make_to_front_matter(
+    tmp_path, make_site
+):
+    src = make_site({"feeds": False}, PAGES)
+    cache = BuildCache()
+
+    for build in ("first", "second"):
+        out = tmp_path / build
+        generator.generate_site(
+            str(src), str(out), cache=cache, plugins=[ExclaimPlugin()]
+        )
+        html = (out / "a.html").read_text(encoding="utf-8")
+        assert "<title>a!</title>" in html
+
+    assert cache.content_index[str(src / "a.md")]["config"]["title"] == "a"
+
+
+@pytest.fixture
+def exported(tmp_path, make_site):
+    src = make_site({"feeds": False}, PAGES)
+    out = tmp_path / "out"
+    archive = tmp_path / "cache.tar.gz"
+    warm = BuildCache()
+    generator.generate_site(str(src), str(out), cache=warm)
+    counts = export_archive(warm, str(archive), str(src), str(out), bytecode=True)
+    return src, out, archive, counts
+
+
+def test_export_and_import_round_trip_discards_stale_entries(tmp_path, exported):
+    src, _, archive, counts = exported
+    assert counts["content"] == 2
+    assert counts["templates"] > 0
+    (src / "b.md").write_text(
+        "---\ntitle: b\npublished: true\n---\nChanged", encoding="utf-8"
+    )
+
+    cache = BuildCache()
+    imported = import_archive(cache, str(archive), str(src))
+
+    assert (imported["content"], imported["stale"]) == (1, 1)
+    entry = cache.content_index[str(src / "a.md")]
+    assert entry["config"]["date"] == date(2024, 1, 2)
+
+    stats = generator.generate_site(str(src), str(tmp_path / "fresh"), cache=cache)
+    assert stats["pages"] == 2
+    # Only the changed page's Markdown is rendered again
+    assert cache.misses == 1
+
+
+def test_imported_bytecode_skips_template_compilation(tmp_path, monkeypatch, exported):
+    src, _, archive, _ = exported
+    compiled = []
+    original = jinja2.Environment.compile
+
+    def counting_compile(self, *args, **kwargs):
+        compiled.append(args)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(jinja2.Environment, "compile", counting_compile)
+    cache = BuildCache()
+    import_archive(cache, str(archive), str(src), trust_bytecode=True)
+    generator.generate_site(str(src), str(tmp_path / "fresh"), cache=cache)
+
+    assert compiled == []
+
+
+def test_bytecode_is_only_exported_and_imported_on_request(tmp_path, exported):
+    src, out, archive, _ = exported
+
+    cache = BuildCache()
+    counts = import_archive(cache, str(archive), str(src))
+    assert counts["templates"] == 0
+    assert cache.bytecode.entries == {}
+
+    generator.generate_site(str(src), str(tmp_path / "fresh"), cache=cache)
+    assert cache.bytecode.entries
+    plain = tmp_path / "plain.tar.gz"
+    counts = export_archive(cache, str(plain), str(src), str(out))
+    assert counts["templates"] == 0
+    with tarfile.open(plain) as tar:
+        assert not any(name.startswith("bytecode/") for name in tar.getnames())
+
+
+def test_import_restores_manifest_only_into_empty_output(tmp_path, exported):
+    src, out, archive, _ = exported
+    restored = tmp_path / "restored"
+
+    import_archive(BuildCache(), str(archive), str(src), str(restored))
+
+    assert (restored / MANIFEST_FILENAME).read_bytes() == (
+        out / MANIFEST_FILENAME
+    ).read_bytes()
+
+
+def test_import_rejects_tampered_archive(exported):
+    src, _, archive, _ = exported
+    with tarfile.open(archive, "r:gz") as tar:
+        members = {info.name: tar.extractfile(info).read() for info in tar}
+    members["rendered.json"] = b"{}"
+    with tarfile.open(archive, "w:gz") as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+    with pytest.raises(CacheArchiveError, match="rendered.json is corrupt"):
+        import_archive(BuildCache(), str(archive), str(src))
+
+
+def test_cache_commands(tmp_path, make_site):
+    src = make_site({"feeds": False}, PAGES)
+    archive = tmp_path / "cache.tar.gz"
+    runner = CliRunner()
+
+    missing = runner.invoke(
+        cli.app,
+        ["cache", "import", str(archive), str(src), "--output", str(tmp_path / "a")],
+    )
+    exported = runner.invoke(
+        cli.app,
+        ["cache", "export", str(src), str(archive), "--output", str(tmp_path / "a")],
+    )
+    imported = runner.invoke(
+        cli.app,
+        ["cache", "import", str(archive), str(src), "--output", str(tmp_path / "b")],
+    )
+
+    assert missing.exit_code == 0
+    assert "Ignoring cache archive" in missing.stdout
+    assert exported.exit_code == 0
+    assert "Exported 2 content files" in exported.stdout
+    assert imported.exit_code == 0
+    assert "Imported 2 content files (0 stale discarded)" in imported.stdout
+    assert "2 pages rendered" in imported.stdout
@@ -1,3 +1,8 @@
+import os
+from pathlib import Path
+import subprocess
+import sys
+
 from typer.testing import CliRunner
 import yaml
 
@@ -83,7 +88,7 @@ def test_generate_command_reports_static_directories(tmp_path):
 
     # Should report static directories in output
     assert "Site generation complete" in result.stdout
-    assert "1 pages created" in result.stdout
+    assert "1 pages rendered" in result.stdout
     assert "2 static directories copied" in result.stdout
     assert "0 errors" in result.stdout
 
@@ -92,6 +97,23 @@ def test_generate_command_reports_static_directories(tmp_path):
     assert (out / "assets" / "style.css").exists()
 
 
+def test_generate_command_reports_unchanged_pages(tmp_path):
+    src = tmp_path / "site"
+    src.mkdir()
+    (src / "_config.yaml").write_text(
+        yaml.safe_dump({"theme": "minimal"}), encoding="utf-8"
+    )
+    (src / "page.md").write_text("---\npublished: true\n---\nPage", encoding="utf-8")
+    args = ["generate", str(src), "--output", str(tmp_path / "out"), "--no-daemon"]
+
+    runner = CliRunner()
+    runner.invoke(cli.app, args)
+    result = runner.invoke(cli.app, args)
+
+    assert result.exit_code == 0
+    assert "0 pages rendered, 1 unchanged" in result.stdout
+
+
 def test_generate_command_without_static_directories(tmp_path):
     """Test that generate command works when no static directories exist."""
     src = tmp_path / "site"
@@ -115,7 +137,7 @@ def test_generate_command_without_static_directories(tmp_path):
 
     # Should not mention static directories when none exist
     assert "Site generation complete" in result.stdout
-    assert "1 pages created" in result.stdout
+    assert "1 pages rendered" in result.stdout
     assert "static directories copied" not in result.stdout
     assert "0 errors" in result.stdout
 
@@ -168,7 +190,7 @@ def test_generate_command_reports_theme_assets(tmp_path):
 
         # Should report theme assets in output
         assert "Site generation complete" in result.stdout
-        assert "1 pages created" in result.stdout
+        assert "1 pages rendered" in result.stdout
         assert "2 theme assets copied" in result.stdout
         assert "0 errors" in result.stdout
 
@@ -233,7 +255,7 @@ def test_generate_command_with_static_dirs_and_theme_assets(tmp_path):
 
         # Should report both static directories and theme assets
         assert "Site generation complete" in result.stdout
-        assert "1 pages created" in result.stdout
+        assert "1 pages rendered" in result.stdout
         assert "1 static directories copied" in result.stdout
         assert "1 theme assets copied" in result.stdout
         assert "0 errors" in result.stdout
@@ -245,3 +267,75 @@ def test_generate_command_with_static_dirs_and_theme_assets(tmp_path):
     finally:
         # Restore original config
         config.THEMES_DIR = original_themes_dir
+
+
+def test_generate_command_only_builds_matching_paths(tmp_path):
+    src = tmp_path / "site"
+    (src / "blog").mkdir(parents=True)
+    (src / "_config.yaml").write_text(
+        yaml.safe_dump({"theme": "minimal"}), encoding="utf-8"
+    )
+    (src / "blog" / "_config.yaml").write_text(
+        yaml.safe_dump({"title": "Blog"}), encoding="utf-8"
+    )
+    (src / "page.md").write_text("---\npublished: true\n---\nPage", encoding="utf-8")
+    (src / "blog" / "post.md").write_text(
+        "---\npublished: true\n---\nPost", encoding="utf-8"
+    )
+    out = tmp_path / "out"
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli.app,
+        ["generate", str(src), "--output", str(out), "--only", "blog/", "--no-daemon"],
+    )
+
+    assert result.exit_code == 0
+    assert (out / "blog" / "post.html").exists()
+    assert (out / "blog" / "index.html").exists()
+    assert not (out / "page.html").exists()
+
+
+def _imported_modules(statement: str) -> set[str]:
+    """Return the modules imported by `statement`, per `python -X importtime`."""
+    repo_root = Path(__file__).resolve().parent.parent
+    env = dict(os.environ, PYTHONPATH=str(repo_root))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            modules.add(line.rsplit("|", 1)[1].strip())
+    return modules
+
+
+def test_cli_import_does_not_load_heavy_dependencies():
+    """Importing the CLI (e.g. for `slarti --help`) must stay cheap."""
+    modules = _imported_modules("import slartibartfast.cli")
+
+    assert "slartibartfast.cli" in modules
+    heavy = {
+        "watchdog",
+        "http.server",
+        "jinja2",
+        "markdown_it",
+        "mdit_py_plugins",
+        "yaml",
+        "slartibartfast.generator",
+        "slartibartfast.server",
+    }
+    assert not heavy & modules
+
+
+def test_generator_import_defers_markdown_parser():
+    """The Markdown parser is built on first use, not at import time."""
+    modules = _imported_modules("import slartibartfast.generator")
+
+    assert "slartibartfast.generator" in modules
+    assert "markdown_it" not in modules
+    assert "mdit_py_plugins" not in modules
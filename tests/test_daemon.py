@@ -0,0 +1,144 @@
+import os
+import socket
+import tarfile
+import threading
+
+import pytest
+from typer.testing import CliRunner
+
+from slartibartfast import cli, daemon
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(socket, "AF_UNIX"), reason="requires Unix domain sockets"
+)
+
+
+FILES = {"page.md": "---\npublished: true\n---\n# Title\n\nContent"}
+
+
+@pytest.fixture
+def running_daemon(tmp_path):
+    socket_path = str(tmp_path / "d.sock")
+    server = daemon.create_server(socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_generate_returns_none_without_daemon(tmp_path, make_site):
+    src = make_site(files=FILES)
+    response = daemon.generate(
+        str(src), str(tmp_path / "out"), socket_path=str(tmp_path / "none.sock")
+    )
+    assert response is None
+    assert not (tmp_path / "out").exists()
+
+
+def test_daemon_builds_with_warm_cache(tmp_path, make_site, running_daemon):
+    src = make_site(files=FILES)
+    out = tmp_path / "out"
+
+    first = daemon.generate(str(src), str(out), running_daemon.socket_path)
+    second = daemon.generate(str(src), str(out), running_daemon.socket_path)
+
+    assert first["stats"]["pages"] == 1
+    assert second["stats"]["unchanged"] == 1
+    assert (out / "page.html").exists()
+    # The second build reuses the rendered Markdown from the first
+    assert running_daemon.cache.hits >= 1
+    ping = daemon.request({"command": "ping"}, running_daemon.socket_path)
+    assert ping["builds"] == 2
+
+
+def test_daemon_reports_build_errors(tmp_path, running_daemon):
+    with pytest.raises(daemon.DaemonError, match="FileNotFoundError"):
+        daemon.generate(
+            str(tmp_path / "missing"), str(tmp_path / "out"), running_daemon.socket_path
+        )
+
+
+def test_create_server_replaces_stale_socket(tmp_path):
+    socket_path = tmp_path / "stale.sock"
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(socket_path))
+    stale.close()
+
+    server = daemon.create_server(str(socket_path))
+    server.server_close()
+
+    assert not socket_path.exists()
+
+
+def test_create_server_refuses_second_daemon(running_daemon):
+    with pytest.raises(daemon.DaemonError, match="already listening"):
+        daemon.create_server(running_daemon.socket_path)
+
+
+def test_generate_command_uses_running_daemon(
+    tmp_path, make_site, running_daemon, monkeypatch
+):
+    src = make_site(files=FILES)
+    monkeypatch.setenv(daemon.SOCKET_ENV_VAR, running_daemon.socket_path)
+    out = tmp_path / "out"
+
+    runner = CliRunner()
+    result = runner.invoke(cli.app, ["generate", str(src), "--output", str(out)])
+
+    assert result.exit_code == 0
+    assert "1 pages rendered" in result.stdout
+    assert running_daemon.builds == 1
+    assert (out / "page.html").exists()
+
+
+def test_generate_command_builds_archives_in_process(
+    tmp_path, make_site, running_daemon, monkeypatch
+):
+    src = make_site(files=FILES)
+    monkeypatch.setenv(daemon.SOCKET_ENV_VAR, running_daemon.socket_path)
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+    archive = tmp_path / "site.tar"
+
+    result = CliRunner().invoke(
+        cli.app, ["generate", str(src), "--output", str(archive)]
+    )
+
+    assert result.exit_code == 0, result.stdout
+    assert running_daemon.builds == 0
+    assert f"files to {archive}." in result.stdout
+    with tarfile.open(archive) as tar:
+        assert {member.mtime for member in tar.getmembers()} == {1700000000}
+
+
+def test_default_socket_path_is_private(tmp_path, monkeypatch):
+    monkeypatch.delenv(daemon.SOCKET_ENV_VAR, raising=False)
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr(daemon.tempfile, "gettempdir", lambda: str(tmp_path))
+    directory = str(tmp_path / f"slarti-{os.getuid()}")
+
+    # Clients only look for the socket
+    assert daemon.default_socket_path() == os.path.join(directory, "slarti.sock")
+    assert daemon.generate("site", "out") is None
+    assert not os.path.exists(directory)
+
+    socket_path = daemon.default_socket_path(create=True)
+
+    assert os.path.dirname(socket_path) == directory
+    assert os.stat(directory).st_mode & 0o077 == 0
+
+    os.chmod(directory, 0o777)
+    with pytest.raises(daemon.DaemonError, match="not a private directory"):
+        daemon.default_socket_path()
+
+
+def test_request_refuses_sockets_owned_by_another_user(
+    tmp_path, make_site, running_daemon, monkeypatch
+):
+    src = make_site(files=FILES)
+    other_uid = os.getuid() + 1
+    monkeypatch.setattr(daemon.os, "getuid", lambda: other_uid)
+
+    with pytest.raises(daemon.DaemonError, match="belongs to another user"):
+        daemon.generate(str(src), str(tmp_path / "out"), running_daemon.socket_path)
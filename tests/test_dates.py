@@ -0,0 +1,117 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from slartibartfast import dates, generator
+from slartibartfast.cache import BuildCache
+
+# 2021-03-04 12:00 UTC
+TIMESTAMP = 1614859200
+
+
+FILES = {
+    "blog/_config.yaml": {"title": "Blog"},
+    "blog/undated.md": "---\npublished: true\n---\nHi",
+    "blog/dated.md": "---\npublished: true\ndate: 2020-01-01\n---\nHi",
+}
+
+
+def _pages(src, cache=None, date_source="auto"):
+    pages = generator.collect_pages_metadata(
+        str(src), cache=cache or BuildCache(), date_source=date_source
+    )
+    return {page["url"]: page for page in pages}
+
+
+def test_undated_pages_use_their_modification_time(make_site):
+    pages = _pages(make_site(files=FILES, mtime=TIMESTAMP), date_source="mtime")
+
+    assert pages["/blog/undated.html"]["date"] == "2021-03-04"
+    assert str(pages["/blog/dated.html"]["date"]) == "2020-01-01"
+    # Sections take their newest page's date
+    assert pages["/blog/index.html"]["date"] == "2021-03-04"
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_undated_pages_use_their_last_commit_date(make_site):
+    src = make_site(files=FILES, mtime=TIMESTAMP)
+    env = dict(
+        os.environ,
+        GIT_AUTHOR_NAME="a",
+        GIT_AUTHOR_EMAIL="a@example.com",
+        GIT_COMMITTER_NAME="a",
+        GIT_COMMITTER_EMAIL="a@example.com",
+        GIT_COMMITTER_DATE="2019-05-06T10:00:00+00:00",
+    )
+    for command in (["init", "-q"], ["add", "."], ["commit", "-q", "-m", "Add"]):
+        subprocess.run(["git", "-C", str(src), *command], check=True, env=env)
+    (src / "blog" / "new.md").write_text(
+        "---\npublished: true\n---\nNot committed", encoding="utf-8"
+    )
+    os.utime(src / "blog" / "new.md", (TIMESTAMP, TIMESTAMP))
+
+    pages = _pages(src)
+
+    assert pages["/blog/undated.html"]["date"] == "2019-05-06"
+    assert pages["/blog/new.html"]["date"] == "2021-03-04"
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_git_dates_only_walk_the_history_of_the_site(tmp_path, monkeypatch, make_site):
+    src = make_site(files=FILES, mtime=TIMESTAMP)
+    env = dict(
+        os.environ,
+        GIT_AUTHOR_NAME="a",
+        GIT_AUTHOR_EMAIL="a@example.com",
+        GIT_COMMITTER_NAME="a",
+        GIT_COMMITTER_EMAIL="a@example.com",
+        GIT_COMMITTER_DATE="2019-05-06T10:00:00+00:00",
+    )
+    (tmp_path / "other.txt").write_text("other", encoding="utf-8")
+    for command in (["init", "-q"], ["add", "."], ["commit", "-q", "-m", "Add"]):
+        subprocess.run(["git", "-C", str(tmp_path), *command], check=True, env=env)
+    calls = []
+    git = dates._git
+    monkeypatch.setattr(dates, "_git", lambda *args: calls.append(args) or git(*args))
+
+    pages = _pages(src)
+
+    assert pages["/blog/undated.html"]["date"] == "2019-05-06"
+    assert calls[-1][-2:] == ("--", "site/blog")
+
+
+def test_source_dates_are_cached_in_the_content_index(monkeypatch, make_site):
+    src = make_site(files=FILES, mtime=TIMESTAMP)
+    cache = BuildCache()
+    _pages(src, cache, date_source="mtime")
+    monkeypatch.setattr(
+        dates, "mtime_date", lambda path: pytest.fail("date was not cached")
+    )
+
+    pages = _pages(src, cache, date_source="mtime")
+
+    assert pages["/blog/undated.html"]["date"] == "2021-03-04"
+
+
+def test_rebuilding_the_same_inputs_gives_identical_output(tmp_path, make_site):
+    src = make_site(files=FILES, mtime=TIMESTAMP)
+    first, second = tmp_path / "first", tmp_path / "second"
+
+    generator.generate_site(str(src), str(first), cache=BuildCache())
+    generator.generate_site(str(src), str(second), cache=BuildCache())
+
+    for directory, _, filenames in os.walk(first):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            other = os.path.join(second, os.path.relpath(path, first))
+            with open(path, "rb") as a, open(other, "rb") as b:
+                assert a.read() == b.read(), path
+    sitemap = (first / "sitemap.xml").read_text(encoding="utf-8")
+    assert "<lastmod>2021-03-04</lastmod>" in sitemap
+
+
+def test_unknown_date_source_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="date_source"):
+        dates.source_dates([str(tmp_path / "x.md")], BuildCache(), "ctime")
@@ -0,0 +1,85 @@
+import os
+
+from slartibartfast import feeds, generator
+
+
+def _page(url, day, html="<p>x</p>"):
+    return {
+        "url": url,
+        "filename": url.lstrip("/").replace(".html", ".md"),
+        "title": url,
+        "description": "",
+        "date": f"2025-01-{day:02d}",
+        "publish_date": None,
+        "html": html,
+        "config": {"date": f"2025-01-{day:02d}"},
+    }
+
+
+def test_select_latest_returns_newest_first_and_skips_listings():
+    pages = [_page(f"/p{day}.html", day) for day in (3, 1, 5, 2, 4)]
+    pages.append({"url": "/blog/index.html", "html": "", "pages": [], "date": "2030"})
+
+    latest = feeds.select_latest(pages, 3)
+
+    assert [page["url"] for page in latest] == ["/p5.html", "/p4.html", "/p3.html"]
+
+
+def test_select_latest_skips_top_level_pages_without_a_date():
+    post = dict(_page("/blog/post.html", 1), config={})
+    about = dict(_page("/about.html", 9), config={})
+    news = dict(_page("/news.html", 8), config={"feed": True})
+    hidden = dict(_page("/blog/hidden.html", 7), config={"feed": False})
+    dated = _page("/launch.html", 2)
+
+    latest = feeds.select_latest([post, about, news, hidden, dated])
+
+    assert [page["url"] for page in latest] == [
+        "/news.html",
+        "/launch.html",
+        "/blog/post.html",
+    ]
+
+
+def test_generate_atom_feed_reuses_rendered_html():
+    entries = [_page("/post.html", 7, html="<p>Hello & bye</p>")]
+    config = {"base_url": "https://example.com/", "title": "Site"}
+
+    atom = feeds.generate_atom_feed(entries, config, "/feed.xml")
+
+    assert "<id>https://example.com/post.html</id>" in atom
+    assert "&lt;p&gt;Hello &amp; bye&lt;/p&gt;" in atom
+    assert "<updated>2025-01-07T00:00:00+00:00</updated>" in atom
+
+
+def test_generate_feeds_only_rewrites_changed_files(tmp_path):
+    pages = [_page("/a.html", 1), _page("/b.html", 2)]
+    out = str(tmp_path)
+
+    assert feeds.generate_feeds(pages, {"title": "Site"}, out) == 2
+    assert feeds.generate_feeds(pages, {"title": "Site"}, out) == 0
+
+    pages.append(_page("/c.html", 3))
+    assert feeds.generate_feeds(pages, {"title": "Site"}, out) == 2
+    with open(os.path.join(out, "rss.xml"), encoding="utf-8") as file:
+        assert "/c.html" in file.read()
+
+
+def test_generate_site_writes_section_feeds(tmp_path, make_site):
+    posts = {
+        f"blog/post{day}.md": f"---\npublished: true\ndate: 2025-01-0{day}\n---\n"
+        f"Post {day}"
+        for day in (1, 2)
+    }
+    src = make_site(
+        {"feed_limit": 1}, {"blog/_config.yaml": {"title": "Blog"}, **posts}
+    )
+
+    out = tmp_path / "out"
+    generator.generate_site(str(src), str(out))
+
+    atom = (out / "blog" / "feed.xml").read_text(encoding="utf-8")
+    assert "/blog/post2.html" in atom
+    assert "/blog/post1.html" not in atom
+    assert (out / "feed.xml").exists()
+    assert (out / "rss.xml").exists()
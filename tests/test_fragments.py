@@ -0,0 +1,82 @@
+from jinja2 import DictLoader, Environment
+
+from slartibartfast import generator
+from slartibartfast.cache import BuildCache
+from slartibartfast.fragments import FragmentCacheExtension
+
+
+def _environment(templates):
+    env = Environment(loader=DictLoader(templates), extensions=[FragmentCacheExtension])
+    env.globals["calls"] = []
+    env.globals["render"] = lambda: env.globals["calls"].append(1) or "rendered"
+    return env
+
+
+def test_cache_block_renders_once_per_key():
+    env = _environment({"t.html": '{% cache "nav" %}{{ render() }}{% endcache %}'})
+    template = env.get_template("t.html")
+
+    assert template.render() == "rendered"
+    assert template.render() == "rendered"
+    assert len(env.globals["calls"]) == 1
+    assert (env.fragment_cache.hits, env.fragment_cache.misses) == (1, 1)
+
+
+def test_cache_block_dependencies_are_part_of_the_key():
+    env = _environment(
+        {"t.html": '{% cache "nav", section %}{{ section }}{% endcache %}'}
+    )
+    template = env.get_template("t.html")
+
+    assert template.render(section="blog") == "blog"
+    assert template.render(section="docs") == "docs"
+    assert template.render(section="blog") == "blog"
+    assert (env.fragment_cache.hits, env.fragment_cache.misses) == (1, 2)
+
+
+def test_cache_block_keys_are_scoped_to_the_defining_template():
+    env = _environment(
+        {
+            "a.html": '{% cache "x" %}a{% endcache %}',
+            "b.html": '{% cache "x" %}b{% endcache %}',
+        }
+    )
+
+    assert env.get_template("a.html").render() == "a"
+    assert env.get_template("b.html").render() == "b"
+
+
+def test_cache_blocks_with_the_same_name_keep_their_own_output():
+    env = _environment(
+        {"t.html": '{% cache "x" %}A{% endcache %}|\n{% cache "x" %}B{% endcache %}'}
+    )
+
+    assert env.get_template("t.html").render() == "A|\nB"
+
+
+def test_generate_site_shares_fragments_and_clears_them_per_build(tmp_path, make_site):
+    pages = {
+        f"{name}.md": f"---\ntitle: {name}\npublished: true\n"
+        "template: chrome.html\n---\n"
+        for name in ("a", "b", "c")
+    }
+    chrome = (
+        '{% cache "chrome" %}{{ site.pages | length }} pages{% endcache %}'
+        "|{{ meta.title }}"
+    )
+    src = make_site({"feeds": False}, {"minimal/chrome.html": chrome, **pages})
+    out = tmp_path / "out"
+    cache = BuildCache()
+
+    generator.generate_site(str(src), str(out), cache=cache)
+
+    assert (cache.fragments.hits, cache.fragments.misses) == (2, 1)
+    assert (out / "b.html").read_text(encoding="utf-8") == "3 pages|b"
+
+    (src / "d.md").write_text(
+        "---\ntitle: d\npublished: true\ntemplate: chrome.html\n---\n",
+        encoding="utf-8",
+    )
+    generator.generate_site(str(src), str(out), cache=cache)
+
+    assert (out / "a.html").read_text(encoding="utf-8") == "4 pages|a"
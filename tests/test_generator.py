@@ -1,6 +1,11 @@
+from datetime import date
+import threading
+import time
+
 import yaml
 
 from slartibartfast import generator
+from slartibartfast.cache import BuildCache, load_manifest, save_manifest
 
 
 def test_generate_site_creates_html(tmp_path):
@@ -419,3 +424,585 @@ Content here.
     finally:
         # Restore original config
         config.THEMES_DIR = original_themes_dir
+
+
+def test_build_taxonomies_indexes_pages_by_tag():
+    """Test that build_taxonomies maps each tag to the pages using it."""
+    pages = [
+        {"title": "A", "date": "2025-01-01", "config": {"tags": ["python", "web"]}},
+        {"title": "B", "date": "2025-02-01", "config": {"tags": "python, cli"}},
+        {"title": "C", "date": "2025-03-01", "config": {}},
+    ]
+
+    taxonomies = generator.build_taxonomies(pages)
+
+    assert set(taxonomies["tags"]) == {"python", "web", "cli"}
+    # Newest first within a term
+    assert [p["title"] for p in taxonomies["tags"]["python"]] == ["B", "A"]
+    assert [p["title"] for p in taxonomies["tags"]["cli"]] == ["B"]
+
+
+def test_generate_taxonomy_pages_paginates_terms():
+    """Test that term pages are paginated and a term cloud is generated."""
+    pages = [
+        {"title": f"Post {i}", "date": f"2025-01-{i:02d}", "config": {}}
+        for i in range(1, 6)
+    ]
+    taxonomies = {"tags": {"Big Data": pages}}
+
+    generated = generator.generate_taxonomy_pages(taxonomies, per_page=2)
+    by_filename = {page["filename"]: page for page in generated}
+
+    assert set(by_filename) == {
+        "tags/big-data/index.html",
+        "tags/big-data/page/2/index.html",
+        "tags/big-data/page/3/index.html",
+        "tags/index.html",
+    }
+    first = by_filename["tags/big-data/index.html"]
+    assert len(first["pages"]) == 2
+    assert first["paginator"]["prev_url"] is None
+    assert first["paginator"]["next_url"] == "/tags/big-data/page/2/index.html"
+    last = by_filename["tags/big-data/page/3/index.html"]
+    assert len(last["pages"]) == 1
+    assert last["paginator"]["prev_url"] == "/tags/big-data/page/2/index.html"
+    assert last["paginator"]["next_url"] is None
+
+    cloud = by_filename["tags/index.html"]["terms"]
+    assert cloud == [
+        {
+            "name": "Big Data",
+            "title": "Big Data",
+            "slug": "big-data",
+            "url": "/tags/big-data/index.html",
+            "count": 5,
+        }
+    ]
+
+
+def test_taxonomy_slugs_are_unique_and_never_empty():
+    slugs = generator.taxonomy_slugs(["C++", "C", "c-2", "!!!"])
+
+    assert slugs["C"] == "c"
+    assert slugs["C++"] == "c-3"
+    assert slugs["c-2"] == "c-2"
+    assert slugs["!!!"].startswith("term-")
+    assert len(set(slugs.values())) == 4
+
+
+def test_generate_taxonomy_pages_keeps_clashing_terms_apart():
+    pages = [{"title": "Post", "date": "2025-01-01", "config": {}}]
+    taxonomies = {"tags": {"C++": pages, "C": pages, "!!!": pages}}
+
+    generated = generator.generate_taxonomy_pages(taxonomies)
+    filenames = [page["filename"] for page in generated]
+
+    assert len(filenames) == len(set(filenames)) == 4
+    assert "tags//index.html" not in filenames
+    cloud = generated[-1]
+    assert cloud["filename"] == "tags/index.html"
+    assert {term["name"]: term["slug"] for term in cloud["terms"]}["C++"] == "c-2"
+
+
+def test_generate_site_links_clashing_terms_to_their_own_pages(tmp_path):
+    src = tmp_path / "site"
+    (src / "minimal").mkdir(parents=True)
+    (src / "_config.yaml").write_text(
+        yaml.safe_dump({"theme": "minimal"}), encoding="utf-8"
+    )
+    (src / "post.md").write_text(
+        "---\ntitle: Post\npublished: true\ntemplate: links.html\n"
+        "tags: [C++, C]\n---\nPost",
+        encoding="utf-8",
+    )
+    (src / "minimal" / "links.html").write_text(
+        "{% for tag in meta.tags %}/tags/{{ tag|term_slug }}/ {% endfor %}",
+        encoding="utf-8",
+    )
+    out = tmp_path / "out"
+
+    generator.generate_site(str(src), str(out))
+
+    assert (out / "post.html").read_text(encoding="utf-8") == "/tags/c-2/ /tags/c/ "
+    assert (out / "tags" / "c-2" / "index.html").exists()
+    assert (out / "tags" / "c" / "index.html").exists()
+
+
+def test_generate_site_creates_tag_pages(tmp_path):
+    """Test that generate_site renders tag pages and exposes site.taxonomies."""
+    src = tmp_path / "site"
+    src.mkdir()
+    cfg = {"theme": "minimal"}
+    (src / "_config.yaml").write_text(yaml.safe_dump(cfg), encoding="utf-8")
+    (src / "one.md").write_text(
+        "---\ntitle: One\npublished: true\ntags: [python]\n---\nOne", encoding="utf-8"
+    )
+    (src / "two.md").write_text(
+        "---\ntitle: Two\npublished: true\n"
+        "template: tagged.html\ntags: [python, web]\n---\nTwo",
+        encoding="utf-8",
+    )
+    theme_dir = src / "minimal"
+    theme_dir.mkdir()
+    (theme_dir / "tagged.html").write_text(
+        "{{ site.taxonomies.tags.python | length }}", encoding="utf-8"
+    )
+
+    out = tmp_path / "out"
+    stats = generator.generate_site(str(src), str(out))
+
+    assert stats["errors"] == 0
+    assert (out / "two.html").read_text(encoding="utf-8") == "2"
+    tag_html = (out / "tags" / "python" / "index.html").read_text(encoding="utf-8")
+    assert "One" in tag_html and "Two" in tag_html
+    cloud_html = (out / "tags" / "index.html").read_text(encoding="utf-8")
+    assert "/tags/web/index.html" in cloud_html
+    assert "/tags/python/index.html" in (out / "sitemap.xml").read_text(
+        encoding="utf-8"
+    )
+
+
+def test_generate_site_reuses_build_cache(tmp_path):
+    """Test that a shared BuildCache is reused and still sees edited content."""
+    from slartibartfast.cache import BuildCache
+
+    src = tmp_path / "site"
+    src.mkdir()
+    cfg = {"theme": "minimal"}
+    (src / "_config.yaml").write_text(yaml.safe_dump(cfg), encoding="utf-8")
+    page = src / "page.md"
+    page.write_text("---\npublished: true\n---\nFirst", encoding="utf-8")
+    out = tmp_path / "out"
+    cache = BuildCache()
+
+    generator.generate_site(str(src), str(out), cache=cache)
+    environments = dict(cache.environments)
+    generator.generate_site(str(src), str(out), cache=cache)
+
+    assert cache.environments == environments
+    assert cache.hits >= 1
+
+    page.write_text("---\npublished: true\n---\nSecond version", encoding="utf-8")
+    generator.generate_site(str(src), str(out), cache=cache)
+
+    assert "Second version" in (out / "page.html").read_text(encoding="utf-8")
+    assert len(cache.content_index) == 1
+
+
+def test_render_markdown_derives_toc_excerpt_and_reading_time():
+    """Test that one parse yields HTML, anchors, TOC, excerpt and word count."""
+    content = """# Intro
+
+First *paragraph* with `code`.
+
+## Details
+
+More words here.
+
+## Details
+
+### Deep
+"""
+    document = generator.render_markdown(content)
+
+    assert '<h1 id="intro">Intro</h1>' in document["html"]
+    assert '<h2 id="details-1">Details</h2>' in document["html"]
+    assert document["toc"] == [
+        {
+            "level": 1,
+            "id": "intro",
+            "title": "Intro",
+            "children": [
+                {"level": 2, "id": "details", "title": "Details", "children": []},
+                {
+                    "level": 2,
+                    "id": "details-1",
+                    "title": "Details",
+                    "children": [
+                        {"level": 3, "id": "deep", "title": "Deep", "children": []}
+                    ],
+                },
+            ],
+        }
+    ]
+    assert document["excerpt"] == "First paragraph with code."
+    assert document["word_count"] == 11
+    assert document["reading_time"] == 1
+
+
+def test_render_markdown_heading_ids_are_unique():
+    document = generator.render_markdown("# A 1\n\n# A\n\n# A\n\n# A\n")
+
+    ids = [heading["id"] for heading in document["toc"]]
+    assert ids == ["a-1", "a", "a-2", "a-3"]
+    assert '<h1 id="a-2">A</h1>' in document["html"]
+
+
+def test_render_markdown_truncates_long_excerpts():
+    """Test that long first paragraphs are cut on a word boundary."""
+    document = generator.render_markdown("word " * 100)
+
+    assert len(document["excerpt"]) <= generator.EXCERPT_LENGTH + 1
+    assert document["excerpt"].endswith("word…")
+    assert document["reading_time"] == 1
+
+
+def test_generate_site_exposes_toc_excerpt_and_reading_time(tmp_path):
+    """Test that templates receive toc, excerpt and reading_time."""
+    src = tmp_path / "site"
+    theme_dir = src / "minimal"
+    theme_dir.mkdir(parents=True)
+    cfg = {"theme": "minimal"}
+    (src / "_config.yaml").write_text(yaml.safe_dump(cfg), encoding="utf-8")
+    (theme_dir / "extras.html").write_text(
+        "{{ toc[0].id if toc }}|{{ excerpt }}|{{ reading_time }}", encoding="utf-8"
+    )
+    (src / "page.md").write_text(
+        "---\npublished: true\ntemplate: extras.html\n---\n# Hi there\n\nBody text.",
+        encoding="utf-8",
+    )
+    (src / "timed.md").write_text(
+        "---\npublished: true\ntemplate: extras.html\nreading_time: 7\n---\nShort.",
+        encoding="utf-8",
+    )
+
+    out = tmp_path / "out"
+    generator.generate_site(str(src), str(out))
+
+    assert (out / "page.html").read_text(encoding="utf-8") == "hi-there|Body text.|1"
+    assert (out / "timed.html").read_text(encoding="utf-8").endswith("|7")
+
+
+def _theme_site(tmp_path):
+    """A site whose theme has a shared base, a partial and two page templates."""
+    src = tmp_path / "site"
+    src.mkdir()
+    theme_dir = tmp_path / "themes" / "test_theme"
+    theme_dir.mkdir(parents=True)
+    cfg = {"theme": "test_theme", "feeds": False}
+    (src / "_config.yaml").write_text(yaml.safe_dump(cfg), encoding="utf-8")
+    (theme_dir / "base.html").write_text(
+        "<html>{% block content %}{% endblock %}</html>", encoding="utf-8"
+    )
+    (theme_dir / "partial.html").write_text("partial", encoding="utf-8")
+    (theme_dir / "page.html").write_text(
+        "{% extends 'base.html' %}{% block content %}{{ content }}{% endblock %}",
+        encoding="utf-8",
+    )
+    (theme_dir / "home.html").write_text(
+        "{% extends 'base.html' %}{% block content %}"
+        "{% include 'partial.html' %}{% endblock %}",
+        encoding="utf-8",
+    )
+    (src / "index.md").write_text(
+        "---\npublished: true\ntemplate: home.html\n---\nHome", encoding="utf-8"
+    )
+    (src / "post.md").write_text("---\npublished: true\n---\nPost", encoding="utf-8")
+    return src, theme_dir
+
+
+def test_template_dependencies_resolves_closure_across_theme_dirs(
+    tmp_path, monkeypatch
+):
+    """Test that extends/include targets resolve, preferring site overrides."""
+    import slartibartfast.config as config
+
+    src, theme_dir = _theme_site(tmp_path)
+    monkeypatch.setattr(config, "THEMES_DIR", str(tmp_path / "themes"))
+    override_dir = src / "test_theme"
+    override_dir.mkdir()
+    (override_dir / "partial.html").write_text("override", encoding="utf-8")
+
+    template = generator.template_loader(str(src), "test_theme", "home.html")
+    files = generator.template_dependencies(template.environment, "home.html")
+
+    assert files == sorted(
+        [
+            str(theme_dir / "base.html"),
+            str(theme_dir / "home.html"),
+            str(override_dir / "partial.html"),
+        ]
+    )
+
+
+def test_generate_site_only_rebuilds_pages_using_changed_template(
+    tmp_path, monkeypatch
+):
+    """Test that template edits invalidate exactly the pages that use them."""
+    import slartibartfast.config as config
+
+    src, theme_dir = _theme_site(tmp_path)
+    monkeypatch.setattr(config, "THEMES_DIR", str(tmp_path / "themes"))
+    out = tmp_path / "out"
+
+    first = generator.generate_site(str(src), str(out))
+    assert (first["pages"], first["unchanged"]) == (2, 0)
+
+    second = generator.generate_site(str(src), str(out))
+    assert (second["pages"], second["unchanged"]) == (0, 2)
+
+    (theme_dir / "partial.html").write_text("new partial", encoding="utf-8")
+    third = generator.generate_site(str(src), str(out))
+    assert (third["pages"], third["unchanged"]) == (1, 1)
+    assert "new partial" in (out / "index.html").read_text(encoding="utf-8")
+
+    (theme_dir / "base.html").write_text(
+        "<body>{% block content %}{% endblock %}</body>", encoding="utf-8"
+    )
+    fourth = generator.generate_site(str(src), str(out))
+    assert (fourth["pages"], fourth["unchanged"]) == (2, 0)
+    assert "<body>" in (out / "post.html").read_text(encoding="utf-8")
+
+
+def test_page_fingerprints_do_not_depend_on_the_site_path(tmp_path, monkeypatch):
+    import slartibartfast.config as config
+
+    src, _ = _theme_site(tmp_path)
+    monkeypatch.setattr(config, "THEMES_DIR", str(tmp_path / "themes"))
+    (src / "test_theme").mkdir()
+    (src / "test_theme" / "partial.html").write_text("override", encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    out = tmp_path / "out"
+
+    generator.generate_site("site", str(out), cache=BuildCache())
+    absolute = generator.generate_site(str(src), str(out), cache=BuildCache())
+    relative = generator.generate_site("./site", str(out), cache=BuildCache())
+
+    assert (absolute["pages"], absolute["unchanged"]) == (0, 2)
+    assert (relative["pages"], relative["unchanged"]) == (0, 2)
+    templates = load_manifest(str(out))["pages"]["index.html"]["templates"]
+    assert templates == ["base.html", "home.html", "partial.html"]
+
+
+def test_generate_site_rebuilds_missing_output(tmp_path):
+    """Test that a page is rebuilt if its output file was deleted."""
+    src = tmp_path / "site"
+    src.mkdir()
+    cfg = {"theme": "minimal"}
+    (src / "_config.yaml").write_text(yaml.safe_dump(cfg), encoding="utf-8")
+    (src / "page.md").write_text("---\npublished: true\n---\nHi", encoding="utf-8")
+    out = tmp_path / "out"
+
+    generator.generate_site(str(src), str(out))
+    (out / "page.html").unlink()
+    stats = generator.generate_site(str(src), str(out))
+
+    assert stats["pages"] == 1
+    assert (out / "page.html").exists()
+
+
+def _scheduled_site(tmp_path):
+    src = tmp_path / "site"
+    blog = src / "blog"
+    blog.mkdir(parents=True)
+    (src / "_config.yaml").write_text(
+        yaml.safe_dump({"theme": "minimal", "feeds": False}), encoding="utf-8"
+    )
+    (blog / "_config.yaml").write_text(
+        yaml.safe_dump({"title": "Blog"}), encoding="utf-8"
+    )
+    (src / "about.md").write_text("---\npublished: true\n---\nAbout", encoding="utf-8")
+    (blog / "old.md").write_text(
+        "---\ntitle: Old\npublished: true\ndate: 2024-01-01\n---\nOld post",
+        encoding="utf-8",
+    )
+    (blog / "new.md").write_text(
+        "---\ntitle: New\npublished: true\ndate: 2999-01-01\n"
+        "publish_date: 2999-01-01\n---\nNew post",
+        encoding="utf-8",
+    )
+    return src
+
+
+def test_generate_site_records_next_publish_date(tmp_path):
+    src = _scheduled_site(tmp_path)
+    out = tmp_path / "out"
+
+    stats = generator.generate_site(str(src), str(out))
+
+    assert stats["next_publish"] == "2999-01-01"
+    assert not (out / "blog" / "new.html").exists()
+    manifest = load_manifest(str(out))
+    assert manifest["scheduled"] == [
+        {"filename": "blog/new.md", "publish_date": "2999-01-01"}
+    ]
+    assert generator.published_since(manifest) is None
+
+
+def test_published_since_rebuilds_only_affected_pages(tmp_path, monkeypatch):
+    src = _scheduled_site(tmp_path)
+    out = tmp_path / "out"
+    generator.generate_site(str(src), str(out))
+    manifest = load_manifest(str(out))
+    (out / "about.html").unlink()
+    (out / "blog" / "index.html").unlink()
+    (out / "blog" / "old.html").unlink()
+
+    # The publish date has come
+    monkeypatch.setattr(generator, "date", _FrozenDate)
+    select = generator.published_since(manifest)
+    stats = generator.generate_site(str(src), str(out), only=select)
+
+    assert "New post" in (out / "blog" / "new.html").read_text(encoding="utf-8")
+    # Its section listing and the previous post, which now links to it
+    assert (out / "blog" / "index.html").exists()
+    assert (out / "blog" / "old.html").exists()
+    assert not (out / "about.html").exists()
+    assert stats["pages"] == 3
+    assert stats["next_publish"] is None
+    assert "about.html" in load_manifest(str(out))["pages"]
+
+
+def test_select_paths_matches_directories_globs_and_section_indexes():
+    post = {"filename": "blog/2024-post.md"}
+    draft = {"filename": "blog/draft.md"}
+    blog = {"filename": "blog/index.html", "pages": [post, draft]}
+    pages = [{"filename": "about.md"}, post, draft, blog]
+
+    assert generator.select_paths(["blog/"])(pages) == {
+        "blog/2024-post.md",
+        "blog/draft.md",
+        "blog/index.html",
+    }
+    assert generator.select_paths(["./blog/2024-*.md"])(pages) == {
+        "blog/2024-post.md",
+        "blog/index.html",
+    }
+    assert generator.select_paths(["about.md", "blog"])(pages) == {
+        page["filename"] for page in pages
+    }
+
+
+def test_select_paths_selects_taxonomy_listings_of_selected_pages():
+    post = {"filename": "blog/post.md", "config": {"tags": ["python"]}}
+    other = {"filename": "blog/other.md", "config": {"tags": "rust"}}
+    untagged = {"filename": "about.md", "config": {}}
+    python = {
+        "filename": "tags/python.html",
+        "taxonomy": {"name": "tags", "term": "python"},
+        "pages": [post],
+    }
+    rust = {
+        "filename": "tags/rust.html",
+        "taxonomy": {"name": "tags", "term": "rust"},
+        "pages": [other],
+    }
+    cloud = {"filename": "tags/index.html", "taxonomy": {"name": "tags", "term": None}}
+    pages = [post, other, untagged, python, rust, cloud]
+
+    assert generator.select_paths(["blog/post.md"])(pages) == {
+        "blog/post.md",
+        "tags/python.html",
+        "tags/index.html",
+    }
+    assert generator.select_paths(["about.md"])(pages) == {"about.md"}
+
+
+def test_generate_site_only_renders_selected_paths(tmp_path, monkeypatch):
+    src = _scheduled_site(tmp_path)
+    out = tmp_path / "out"
+    generator.generate_site(str(src), str(out), cache=BuildCache())
+    (out / "about.html").unlink()
+    (out / "blog" / "old.html").unlink()
+    rendered = []
+    render_markdown = generator.render_markdown
+
+    def recording_render(content):
+        rendered.append(content)
+        return render_markdown(content)
+
+    monkeypatch.setattr(generator, "render_markdown", recording_render)
+    stats = generator.generate_site(
+        str(src), str(out), cache=BuildCache(), only=generator.select_paths(["blog/"])
+    )
+
+    assert (out / "blog" / "old.html").exists()
+    assert not (out / "about.html").exists()
+    assert stats["pages"] + stats["unchanged"] == 2
+    assert stats["static_dirs"] == 0
+    assert "About" not in rendered
+    assert "about.html" in load_manifest(str(out))["pages"]
+
+
+def test_malformed_manifest_entries_are_rebuilt(tmp_path):
+    src = _scheduled_site(tmp_path)
+    out = tmp_path / "out"
+    generator.generate_site(str(src), str(out))
+    manifest = load_manifest(str(out))
+    manifest["pages"]["about.html"] = {"templates": []}
+    manifest["pages"]["blog/old.html"] = "garbage"
+    save_manifest(str(out), manifest)
+
+    stats = generator.generate_site(str(src), str(out))
+
+    assert (stats["pages"], stats["errors"]) == (2, 0)
+    assert "fingerprint" in load_manifest(str(out))["pages"]["about.html"]
+
+
+class _FrozenDate(date):
+    @classmethod
+    def today(cls):
+        return cls(3000, 1, 1)
+
+
+def _content_tree(tmp_path):
+    src = tmp_path / "site"
+    (src / "blog").mkdir(parents=True)
+    (src / "images").mkdir()
+    (src / "_config.yaml").write_text(yaml.safe_dump({"theme": "minimal"}))
+    (src / "blog" / "_config.yaml").write_text(yaml.safe_dump({"title": "Blog"}))
+    (src / "images" / "notes.md").write_text("---\npublished: true\n---\nSkip me")
+    for folder, names in (("", "cab"), ("blog", "zyx")):
+        for name in names:
+            (src / folder / f"{name}.md").write_text(
+                f"---\npublished: true\ndate: 2024-01-01\n---\n{name}"
+            )
+    return src
+
+
+def test_collect_pages_metadata_order_is_deterministic(tmp_path):
+    src = _content_tree(tmp_path)
+
+    sequential = generator.collect_pages_metadata(
+        str(src), cache=BuildCache(), workers=1
+    )
+    parallel = generator.collect_pages_metadata(str(src), cache=BuildCache())
+
+    filenames = [page["filename"] for page in sequential]
+    assert filenames == [
+        "a.md",
+        "b.md",
+        "blog/x.md",
+        "blog/y.md",
+        "blog/z.md",
+        "blog/index.html",
+        "c.md",
+    ]
+    assert [page["filename"] for page in parallel] == filenames
+    assert [page["content"] for page in parallel] == [
+        page["content"] for page in sequential
+    ]
+
+
+def test_collect_pages_metadata_reads_files_concurrently(tmp_path, monkeypatch):
+    src = _content_tree(tmp_path)
+    cache = BuildCache()
+    read_page = cache.read_page
+    lock = threading.Lock()
+    active = []
+    peak = []
+
+    def slow_read_page(filepath, parse):
+        with lock:
+            active.append(filepath)
+            peak.append(len(active))
+        time.sleep(0.02)
+        with lock:
+            active.remove(filepath)
+        return read_page(filepath, parse)
+
+    monkeypatch.setattr(cache, "read_page", slow_read_page)
+    pages = generator.collect_pages_metadata(str(src), cache=cache, workers=4)
+
+    assert len(pages) == 7
+    assert max(peak) > 1
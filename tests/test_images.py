@@ -0,0 +1,141 @@
+import os
+import struct
+
+import pytest
+import yaml
+
+from slartibartfast import generator, images
+from slartibartfast.cache import BuildCache
+
+
+def _png(width, height):
+    return (
+        b"\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR"
+        + struct.pack(">II", width, height)
+        + b"\x08\x02\x00\x00\x00"
+    )
+
+
+def _jpeg(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + bytes(9)
+    sof0 = b"\xff\xc0" + struct.pack(">HBHH", 17, 8, height, width) + bytes(10)
+    return b"\xff\xd8" + app0 + sof0 + b"\xff\xda" + bytes(1000)
+
+
+@pytest.mark.parametrize(
+    "name, data",
+    [
+        ("a.png", _png(640, 480)),
+        ("a.gif", b"GIF89a" + struct.pack("<HH", 640, 480) + bytes(20)),
+        ("a.jpg", _jpeg(640, 480)),
+        (
+            "a.webp",
+            b"RIFF\x00\x00\x00\x00WEBPVP8X"
+            + bytes(8)
+            + (639).to_bytes(3, "little")
+            + (479).to_bytes(3, "little"),
+        ),
+        (
+            "a.webp",
+            b"RIFF\x00\x00\x00\x00WEBPVP8L\x00\x00\x00\x00\x2f"
+            + struct.pack("<I", 639 | (479 << 14)),
+        ),
+        ("a.svg", b'<?xml version="1.0"?>\n<svg width="640px" height="480">'),
+        ("a.svg", b'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 640 480">'),
+        ("a.svg", b'<svg width="1280" viewBox="0 0 640 480"></svg>'),
+    ],
+)
+def test_image_size_reads_headers(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+
+    size = images.image_size(str(path))
+
+    assert tuple(size) == ((1280, 960) if b"1280" in data else (640, 480))
+
+
+def test_image_size_rejects_unknown_files(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("not an image")
+
+    assert images.image_size(str(path)) is None
+
+
+def test_cached_image_size_rereads_only_changed_files(tmp_path, monkeypatch):
+    path = tmp_path / "a.png"
+    path.write_bytes(_png(10, 20))
+    cache = BuildCache()
+    assert images.cached_image_size(str(path), cache) == (10, 20)
+
+    monkeypatch.setattr(images, "image_size", lambda filepath: pytest.fail())
+    assert images.cached_image_size(str(path), cache) == (10, 20)
+    assert images.cached_image_size(str(tmp_path / "gone.png"), cache) is None
+
+
+def test_add_image_attributes(tmp_path):
+    (tmp_path / "blog" / "img").mkdir(parents=True)
+    (tmp_path / "blog" / "img" / "a.png").write_bytes(_png(10, 20))
+    html = (
+        '<p><img src="img/a.png" alt="A"></p>'
+        '<img src="https://example.com/b.png" loading="eager" />'
+        '<img src="/blog/img/a.png" width="5">'
+    )
+
+    result, sizes = images.add_image_attributes(
+        html, "/blog/post.html", str(tmp_path), BuildCache()
+    )
+
+    assert result == (
+        '<p><img src="img/a.png" alt="A" width="10" height="20" loading="lazy"'
+        ' decoding="async"></p>'
+        '<img src="https://example.com/b.png" loading="eager" decoding="async" />'
+        '<img src="/blog/img/a.png" width="5" loading="lazy" decoding="async">'
+    )
+    assert sizes == {"img/a.png": [10, 20]}
+
+
+def test_add_image_attributes_ignores_files_outside_the_source(tmp_path):
+    src = tmp_path / "site"
+    (src / "blog").mkdir(parents=True)
+    (tmp_path / "secret.png").write_bytes(_png(10, 20))
+    (src / "blog" / "link.png").symlink_to(tmp_path / "secret.png")
+    (src / "inside.png").write_bytes(_png(3, 4))
+    html = (
+        '<img src="../../secret.png">'
+        '<img src="%2e%2e/%2e%2e/secret.png">'
+        '<img src="/%2e%2e/secret.png">'
+        '<img src="link.png">'
+        '<img src="%2e%2e/inside.png">'
+    )
+
+    result, sizes = images.add_image_attributes(
+        html, "/blog/post.html", str(src), BuildCache()
+    )
+
+    assert sizes == {"%2e%2e/inside.png": [3, 4]}
+    assert result.count('width="') == 1
+
+
+def test_generate_site_adds_image_dimensions(tmp_path):
+    src = tmp_path / "site"
+    (src / "images").mkdir(parents=True)
+    (src / "images" / "photo.png").write_bytes(_png(800, 600))
+    cfg = {"theme": "minimal", "feeds": False}
+    (src / "_config.yaml").write_text(yaml.safe_dump(cfg), encoding="utf-8")
+    (src / "page.md").write_text(
+        "---\npublished: true\n---\n![Photo](/images/photo.png)", encoding="utf-8"
+    )
+    out = tmp_path / "out"
+    cache = BuildCache()
+
+    generator.generate_site(str(src), str(out), cache=cache)
+    html = (out / "page.html").read_text(encoding="utf-8")
+    assert 'width="800" height="600" loading="lazy" decoding="async"' in html
+
+    photo = src / "images" / "photo.png"
+    mtime_ns = photo.stat().st_mtime_ns
+    photo.write_bytes(_png(1600, 1200))
+    os.utime(photo, ns=(mtime_ns + 10**9, mtime_ns + 10**9))
+    stats = generator.generate_site(str(src), str(out), cache=cache)
+    assert stats["pages"] >= 1
+    assert 'width="1600"' in (out / "page.html").read_text(encoding="utf-8")
@@ -0,0 +1,129 @@
+import pytest
+from typer.testing import CliRunner
+import yaml
+
+from slartibartfast import cli, generator, links
+
+
+@pytest.fixture(autouse=True)
+def scan_cache_home(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    return tmp_path / "cache"
+
+
+def _output(tmp_path):
+    out = tmp_path / "out"
+    (out / "blog").mkdir(parents=True)
+    (out / "index.html").write_text(
+        '<a href="/blog/">Blog</a>\n'
+        '<a href="/blog/post.html#intro">Intro</a>\n'
+        '<a href="https://example.com/">Elsewhere</a>\n'
+        '<img src="/logo.png">\n'
+        '<a href="/archive/2019.html">Gone</a>\n',
+        encoding="utf-8",
+    )
+    (out / "blog" / "index.html").write_text(
+        "<a href='post.html'>Post</a> <a href=\"post.html#nope\">Bad</a>",
+        encoding="utf-8",
+    )
+    (out / "blog" / "post.html").write_text(
+        '<h2 id="intro">Intro</h2><a href="#intro">Top</a>', encoding="utf-8"
+    )
+    (out / "logo.png").write_bytes(b"\x89PNG")
+    return out
+
+
+def test_scan_html_finds_ids_and_internal_links():
+    scan = links.scan_html(
+        '<h1 id="top">T</h1>\n<a href="/a.html">A</a>\n'
+        "<a href='mailto:x@example.com'>Mail</a><img src=//cdn.example.com/x.png>"
+    )
+
+    assert scan == {"ids": ["top"], "links": [[2, "/a.html"]]}
+
+
+def test_scan_html_ignores_data_attributes_and_meta_names():
+    scan = links.scan_html(
+        '<img data-src="/lazy.png" src="/a.png">\n'
+        '<meta name="description" content="x"><div data-id="d"></div>\n'
+        '<a name="legacy">Old anchor</a>'
+    )
+
+    assert scan == {"ids": ["legacy"], "links": [[1, "/a.png"]]}
+
+
+def test_check_links_keeps_its_cache_out_of_the_output(tmp_path, scan_cache_home):
+    out = _output(tmp_path)
+
+    links.check_links(str(out))
+
+    assert links.scan_cache_path(str(out)).startswith(str(scan_cache_home))
+    assert (scan_cache_home / "slartibartfast" / "links").is_dir()
+    assert sorted(path.name for path in out.iterdir()) == [
+        "blog",
+        "index.html",
+        "logo.png",
+    ]
+
+
+def test_check_links_reports_missing_pages_and_anchors(tmp_path):
+    out = _output(tmp_path)
+
+    broken = links.check_links(str(out))
+
+    assert broken == [
+        {
+            "source": "blog/index.html",
+            "line": 1,
+            "target": "post.html#nope",
+            "reason": "missing anchor",
+        },
+        {
+            "source": "index.html",
+            "line": 5,
+            "target": "/archive/2019.html",
+            "reason": "missing page",
+        },
+    ]
+
+
+def test_check_links_only_rescans_changed_pages(tmp_path, monkeypatch):
+    out = _output(tmp_path)
+    links.check_links(str(out))
+    (out / "logo.png").unlink()
+    monkeypatch.setattr(
+        links, "_scan_file", lambda path: pytest.fail(f"rescanned {path}")
+    )
+
+    broken = links.check_links(str(out))
+
+    assert {link["target"] for link in broken} == {
+        "post.html#nope",
+        "/archive/2019.html",
+        "/logo.png",
+    }
+
+
+def test_generate_site_can_check_links_after_building(tmp_path):
+    src = tmp_path / "site"
+    src.mkdir()
+    cfg = {"theme": "minimal", "check_links": True, "feeds": False}
+    (src / "_config.yaml").write_text(yaml.safe_dump(cfg), encoding="utf-8")
+    (src / "page.md").write_text(
+        "---\npublished: true\n---\n[Missing](/missing.html)", encoding="utf-8"
+    )
+
+    stats = generator.generate_site(str(src), str(tmp_path / "out"))
+
+    assert stats["broken_links"] >= 1
+
+
+def test_check_links_command(tmp_path):
+    out = _output(tmp_path)
+    runner = CliRunner()
+
+    result = runner.invoke(cli.app, ["check-links", str(out)])
+
+    assert result.exit_code == 1
+    assert "index.html:5: /archive/2019.html (missing page)" in result.stdout
+    assert "2 broken links." in result.stdout
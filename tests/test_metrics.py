@@ -0,0 +1,50 @@
+import threading
+
+from slartibartfast.metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_counter_sums_values_recorded_by_every_thread():
+    counter = Counter("hits_total", "Hits.", ("kind",))
+
+    def record():
+        for _ in range(1000):
+            counter.inc(labels=("a",))
+
+    threads = [threading.Thread(target=record) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc(5, ("b",))
+
+    assert counter.value(("a",)) == 4000
+    assert counter.render() == [
+        "# HELP hits_total Hits.",
+        "# TYPE hits_total counter",
+        'hits_total{kind="a"} 4000',
+        'hits_total{kind="b"} 5',
+    ]
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    assert histogram.count() == 4
+    assert histogram.render()[2:] == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1.0"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 3.65",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_registry_renders_gauges_at_scrape_time():
+    depth = [3]
+    registry = Registry()
+    registry.register(Gauge("queue_depth", "Queued.", lambda: depth[0]))
+    depth[0] = 7
+
+    assert registry.render().endswith("queue_depth 7\n")
@@ -0,0 +1,217 @@
+import json
+import tarfile
+import time
+import zipfile
+
+import pytest
+from typer.testing import CliRunner
+
+from slartibartfast import cli, generator, output
+from slartibartfast.cache import BuildCache
+from slartibartfast.config import MANIFEST_FILENAME
+
+FILES = {
+    **{
+        f"{name}.md": f"---\ntitle: {name}\ndate: 2024-01-0{day}\n"
+        f"published: true\n---\n{name} body"
+        for day, name in enumerate("abc", 1)
+    },
+    "images/logo.png": b"\x89PNG",
+}
+
+
+def _tar_members(path):
+    with tarfile.open(path) as archive:
+        return {
+            info.name: archive.extractfile(info).read() for info in archive.getmembers()
+        }
+
+
+def test_archive_output_is_deterministic_and_skips_the_output_dir(
+    tmp_path, monkeypatch, make_site
+):
+    src = make_site({"title": "Site"}, FILES)
+    monkeypatch.chdir(tmp_path)
+    first, second = tmp_path / "one.tar.gz", tmp_path / "two.tar.gz"
+
+    generator.generate_site(str(src), str(first), cache=BuildCache())
+    generator.generate_site(str(src), str(second), cache=BuildCache())
+
+    assert first.read_bytes() == second.read_bytes()
+    members = _tar_members(first)
+    assert list(members) == sorted(members)
+    assert {"a.html", "sitemap.xml", "feed.xml", "images/logo.png"} <= set(members)
+    assert members["images/logo.png"] == b"\x89PNG"
+    manifest = json.loads(members[MANIFEST_FILENAME])
+    assert set(manifest["pages"]) == {"a.html", "b.html", "c.html"}
+    assert not (tmp_path / "_build").exists()
+    with tarfile.open(first) as archive:
+        assert {info.mtime for info in archive} == {output.DEFAULT_ARCHIVE_EPOCH}
+
+
+def test_archive_output_matches_the_directory_build(tmp_path, make_site):
+    # The theme's assets/ replaces the site's static assets/ directory
+    src = make_site(
+        {"theme": "default"},
+        {"a.md": "---\npublished: true\n---\nA", "assets/app.js": "app()"},
+    )
+    directory, archive = tmp_path / "out", tmp_path / "site.tar"
+
+    generator.generate_site(str(src), str(directory), cache=BuildCache())
+    generator.generate_site(str(src), str(archive), cache=BuildCache())
+
+    built = {
+        path.relative_to(directory).as_posix()
+        for path in directory.rglob("*")
+        if path.is_file()
+    }
+    assert set(_tar_members(archive)) == built
+    assert "assets/app.js" not in built
+    manifest = json.loads(_tar_members(archive)[MANIFEST_FILENAME])
+    assert set(manifest["files"]) == built - {MANIFEST_FILENAME}
+
+
+def test_zip_archive_output(tmp_path, make_site):
+    src = make_site({"title": "Site"}, FILES)
+    target = tmp_path / "site.zip"
+
+    generator.generate_site(str(src), str(target))
+
+    with zipfile.ZipFile(target) as archive:
+        names = archive.namelist()
+        assert names == sorted(names)
+        assert "b body" in archive.read("b.html").decode("utf-8")
+
+
+def test_archive_since_previous_build_holds_only_changes(tmp_path, make_site):
+    src = make_site({"title": "Site"}, FILES)
+    full = tmp_path / "full.tar"
+    delta = tmp_path / "delta.tar"
+    cache = BuildCache()
+    generator.generate_site(str(src), str(full), cache=cache)
+    (src / "b.md").write_text(
+        "---\ntitle: b\ndate: 2024-01-02\npublished: true\n---\nnew body",
+        encoding="utf-8",
+    )
+    (src / "c.md").unlink()
+
+    with output.open_output(str(delta), since=str(full)) as writer:
+        stats = generator.generate_site(str(src), writer, cache=cache)
+
+    members = _tar_members(delta)
+    assert "b.html" in members
+    assert "a.html" not in members
+    assert "images/logo.png" not in members
+    manifest = json.loads(members[MANIFEST_FILENAME])
+    assert manifest["removed"] == ["c.html"]
+    assert "a.html" in manifest["files"]
+    assert writer.written == len(members) - 1
+    # Removing a page changes site-wide metadata, so both pages render again,
+    # but a.html comes out identical and is left out.
+    assert stats["pages"] == 2
+
+
+def test_generate_command_writes_archive_delta(tmp_path, make_site):
+    src = make_site({"title": "Site"}, FILES)
+    runner = CliRunner()
+    full = tmp_path / "full.tar.gz"
+
+    first = runner.invoke(cli.app, ["generate", str(src), "--output", str(full)])
+    second = runner.invoke(
+        cli.app,
+        [
+            "generate",
+            str(src),
+            "--output",
+            str(tmp_path / "delta.tar.gz"),
+            "--since",
+            str(full),
+        ],
+    )
+    misuse = runner.invoke(
+        cli.app,
+        ["generate", str(src), "--output", str(tmp_path / "dir"), "--since", str(full)],
+    )
+
+    assert first.exit_code == 0
+    assert second.exit_code == 0
+    assert "Wrote 0 files" in second.stdout
+    assert misuse.exit_code == 1
+    assert "needs an archive output" in misuse.stdout
+
+
+def test_zstd_archives_need_a_zstd_module(tmp_path, make_site):
+    try:
+        output._zstd()
+    except RuntimeError:
+        with pytest.raises(RuntimeError, match="zstandard"):
+            output.open_output(str(tmp_path / "site.tar.zst"))
+    else:
+        src = make_site({"title": "Site"}, FILES)
+        generator.generate_site(str(src), str(tmp_path / "site.tar.zst"))
+        assert (tmp_path / "site.tar.zst").exists()
+
+
+def test_write_behind_output_writes_in_the_background(tmp_path):
+    writer = output.WriteBehindOutput(str(tmp_path / "out"), threads=2)
+
+    with writer:
+        for number in range(20):
+            assert writer.write(f"section{number % 3}/page{number}.html", "x" * number)
+        assert writer.flush() == {}
+        assert (tmp_path / "out" / "section1" / "page19.html").read_text() == "x" * 19
+
+    assert writer._workers == []
+
+
+def test_write_behind_output_applies_back_pressure(tmp_path, monkeypatch):
+    writer = output.WriteBehindOutput(
+        str(tmp_path / "out"), threads=1, max_pending_bytes=100
+    )
+    write_file = writer._write_file
+    monkeypatch.setattr(
+        writer,
+        "_write_file",
+        lambda name, data: (time.sleep(0.005), write_file(name, data)),
+    )
+    peak = 0
+
+    with writer:
+        for number in range(10):
+            writer.write(f"page{number}.html", b"x" * 40)
+            peak = max(peak, writer._pending)
+
+    assert peak <= 100
+    assert len(list((tmp_path / "out").iterdir())) == 10
+
+
+def test_failed_writes_count_as_page_errors(tmp_path, make_site):
+    src = make_site({"title": "Site"}, FILES)
+    out = tmp_path / "out"
+    # A directory where a page should go makes its write fail
+    (out / "a.html").mkdir(parents=True)
+
+    stats = generator.generate_site(str(src), str(out), cache=BuildCache())
+
+    assert (stats["pages"], stats["errors"]) == (2, 1)
+    manifest = json.loads((out / MANIFEST_FILENAME).read_text(encoding="utf-8"))
+    assert set(manifest["pages"]) == {"b.html", "c.html"}
+
+
+def test_failed_writes_of_other_files_count_as_errors(tmp_path, make_site):
+    src = make_site({"title": "Site"}, FILES)
+    out = tmp_path / "out"
+    (out / "sitemap.xml").mkdir(parents=True)
+
+    stats = generator.generate_site(str(src), str(out), cache=BuildCache())
+
+    assert (stats["pages"], stats["errors"]) == (3, 1)
+
+
+def test_incomplete_output_writers_fail_on_construction():
+    class WriteOnly(output.OutputWriter):
+        def write(self, name, data, only_if_changed=False):
+            return True
+
+    with pytest.raises(TypeError, match="abstract"):
+        WriteOnly()
@@ -0,0 +1,148 @@
+import threading
+import time
+
+from slartibartfast import generator
+from slartibartfast.plugins import PluginManager, load_plugin, plugin_name
+
+
+class RecordingPlugin:
+    name = "recorder"
+
+    def __init__(self):
+        self.events = []
+
+    def on_pages_collected(self, pages, config):
+        self.events.append("collected")
+        for page in pages:
+            page["config"]["title"] = page["title"].upper()
+
+    def on_page_rendered(self, page, html, config):
+        self.events.append(f"rendered {page['url']}")
+        return html.replace("body", "BODY")
+
+    def on_build_finished(self, stats, config, output):
+        self.events.append(f"finished {stats['pages']}")
+
+
+def test_generate_site_calls_hooks_in_order(tmp_path, make_site):
+    src = make_site({"feeds": False}, pages=("a", "b"))
+    out = tmp_path / "out"
+    plugin = RecordingPlugin()
+
+    stats = generator.generate_site(str(src), str(out), plugins=[plugin])
+
+    assert plugin.events[0] == "collected"
+    assert sorted(plugin.events[1:3]) == ["rendered /a.html", "rendered /b.html"]
+    assert plugin.events[3] == "finished 2"
+    html = (out / "a.html").read_text(encoding="utf-8")
+    assert "<title>A</title>" in html
+    assert "a BODY" in html
+    assert stats["hooks"]["recorder.on_page_rendered"]["calls"] == 2
+    assert stats["hooks"]["recorder.on_pages_collected"]["calls"] == 1
+
+
+def test_plugins_are_loaded_from_site_config(tmp_path, monkeypatch, make_site):
+    module_dir = tmp_path / "plugins"
+    module_dir.mkdir()
+    (module_dir / "shout.py").write_text(
+        "def on_page_rendered(html, **kwargs):\n    return html.upper()\n",
+        encoding="utf-8",
+    )
+    monkeypatch.syspath_prepend(str(module_dir))
+    src = make_site({"feeds": False, "plugins": ["shout"]}, pages=("a",))
+    out = tmp_path / "out"
+
+    stats = generator.generate_site(str(src), str(out))
+
+    assert "A BODY" in (out / "a.html").read_text(encoding="utf-8")
+    assert stats["hooks"]["shout.on_page_rendered"]["calls"] == 1
+
+
+def test_load_plugin_instantiates_classes():
+    plugin = load_plugin("tests.test_plugins:RecordingPlugin")
+
+    assert type(plugin).__name__ == "RecordingPlugin"
+    assert plugin_name(plugin) == "recorder"
+    assert plugin.events == []
+
+
+def test_plugin_manager_serializes_plugins_that_are_not_parallel_safe():
+    class Plugin:
+        parallel_safe = False
+
+        def __init__(self):
+            self.active = 0
+            self.overlapped = False
+
+        def on_page_rendered(self, html, **kwargs):
+            self.active += 1
+            self.overlapped |= self.active > 1
+            time.sleep(0.01)
+            self.active -= 1
+
+    class ParallelPlugin(Plugin):
+        parallel_safe = True
+
+    def run(plugin):
+        manager = PluginManager([plugin])
+        threads = [
+            threading.Thread(
+                target=manager.filter, args=("on_page_rendered", "html", "")
+            )
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return manager
+
+    serial = Plugin()
+    manager = run(serial)
+    assert not serial.overlapped
+    assert manager.timings["Plugin.on_page_rendered"]["calls"] == 4
+
+    parallel = ParallelPlugin()
+    run(parallel)
+    assert parallel.overlapped
+
+
+def test_generate_site_renders_with_worker_threads(tmp_path, make_site):
+    src = make_site({"feeds": False, "render_workers": 4}, pages="abcd")
+    out = tmp_path / "out"
+
+    stats = generator.generate_site(str(src), str(out))
+
+    assert (stats["pages"], stats["errors"]) == (4, 0)
+    assert "c body" in (out / "c.html").read_text(encoding="utf-8")
+
+
+class VersionedPlugin:
+    name = "versioned"
+
+    def __init__(self, version):
+        self.version = version
+        self.rendered = []
+        self.unchanged = []
+
+    def on_page_rendered(self, page, html, config):
+        self.rendered.append(page["url"])
+
+    def on_page_unchanged(self, page, config):
+        self.unchanged.append(page["url"])
+
+
+def test_plugin_version_is_part_of_page_fingerprints(tmp_path, make_site):
+    src = make_site({"feeds": False}, pages=("a", "b"))
+    out = tmp_path / "out"
+    generator.generate_site(str(src), str(out), plugins=[VersionedPlugin("1")])
+
+    same = VersionedPlugin("1")
+    stats = generator.generate_site(str(src), str(out), plugins=[same])
+    assert stats["unchanged"] == 2
+    assert (same.rendered, sorted(same.unchanged)) == ([], ["/a.html", "/b.html"])
+
+    upgraded = VersionedPlugin("2")
+    stats = generator.generate_site(str(src), str(out), plugins=[upgraded])
+    assert stats["pages"] == 2
+    assert sorted(upgraded.rendered) == ["/a.html", "/b.html"]
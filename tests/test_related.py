@@ -0,0 +1,116 @@
+import random
+
+import pytest
+
+from slartibartfast import generator, related
+from slartibartfast.cache import BuildCache
+
+
+def _post(url, date, tags=()):
+    return {
+        "url": url,
+        "title": url,
+        "date": date,
+        "description": "",
+        "config": {"tags": list(tags)},
+    }
+
+
+def _tags(page):
+    return page["config"]["tags"]
+
+
+def test_build_section_index_links_posts_by_date():
+    old, middle, new = (
+        _post("/blog/b.html", "2025-01-01"),
+        _post("/blog/a.html", "2025-02-01"),
+        _post("/blog/c.html", "2025-03-01"),
+    )
+    section = {"url": "/blog/index.html", "pages": [middle, new, old]}
+
+    index = related.build_section_index([middle, new, old, section])
+
+    assert index["/blog/b.html"]["prev"] is None
+    assert index["/blog/b.html"]["next"]["url"] == "/blog/a.html"
+    assert index["/blog/a.html"]["prev"]["url"] == "/blog/b.html"
+    assert index["/blog/a.html"]["next"]["url"] == "/blog/c.html"
+    assert index["/blog/c.html"]["next"] is None
+    assert "/blog/index.html" not in index
+
+
+def test_related_pages_ranks_by_shared_tags():
+    pages = [
+        _post("/a.html", "2025-01-01", ["python", "web", "cli"]),
+        _post("/b.html", "2025-01-02", ["python", "web"]),
+        _post("/c.html", "2025-01-03", ["python"]),
+        _post("/d.html", "2025-01-04", ["cooking"]),
+    ]
+
+    result = related.related_pages(pages, _tags, limit=2)
+
+    assert [page["url"] for page in result["/a.html"]] == ["/b.html", "/c.html"]
+    assert result["/a.html"][0]["score"] == pytest.approx(2 / 6**0.5)
+    assert "/d.html" not in result
+
+
+def test_related_pages_numpy_matches_pure_python(monkeypatch):
+    # NumPy isn't a dependency (not even a dev one), so this only runs where
+    # it happens to be installed; `pip install numpy` to cover the NumPy path.
+    pytest.importorskip("numpy")
+    rng = random.Random(42)
+    vocabulary = [f"tag{i}" for i in range(30)]
+    pages = [
+        _post(f"/p{i}.html", "2025-01-01", rng.sample(vocabulary, rng.randint(0, 5)))
+        for i in range(600)
+    ]
+
+    monkeypatch.setattr(related, "NUMPY_MIN_PAGES", 10**9)
+    expected = related.related_pages(pages, _tags, limit=5)
+    monkeypatch.setattr(related, "NUMPY_MIN_PAGES", 0)
+    monkeypatch.setattr(related, "_CHUNK_ROWS", 128)
+    actual = related.related_pages(pages, _tags, limit=5)
+
+    assert actual == expected
+
+
+def test_build_page_relations_is_cached_until_inputs_change():
+    cache = BuildCache()
+    pages = [
+        _post("/a.html", "2025-01-01", ["python"]),
+        _post("/b.html", "2025-01-02", ["python"]),
+    ]
+
+    first = generator.build_page_relations(pages, {}, cache)
+    assert generator.build_page_relations(pages, {}, cache) is first
+
+    pages[1]["config"]["tags"] = ["rust"]
+    assert generator.build_page_relations(pages, {}, cache) is not first
+
+
+def test_generate_site_exposes_prev_next_and_related(tmp_path, make_site):
+    template = (
+        "{{ prev_page.url if prev_page }}|{{ next_page.url if next_page }}|"
+        "{{ related_pages | map(attribute='url') | join(',') }}"
+    )
+    posts = {
+        f"blog/post{day}.md": f"---\npublished: true\ntemplate: post.html\n"
+        f"date: 2025-01-0{day}\ntags: {tags}\n---\nPost {day}"
+        for day, tags in ((1, "[python]"), (2, "[python, web]"), (3, "[web]"))
+    }
+    src = make_site(
+        files={
+            "blog/_config.yaml": {"title": "Blog"},
+            "minimal/post.html": template,
+            **posts,
+        }
+    )
+
+    out = tmp_path / "out"
+    generator.generate_site(str(src), str(out))
+
+    assert (out / "blog" / "post2.html").read_text(encoding="utf-8") == (
+        "/blog/post1.html|/blog/post3.html|/blog/post3.html,/blog/post1.html"
+    )
+    assert (out / "blog" / "post1.html").read_text(encoding="utf-8") == (
+        "|/blog/post2.html|/blog/post2.html"
+    )
@@ -0,0 +1,83 @@
+from functools import partial
+import socketserver
+import threading
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from slartibartfast import server
+from slartibartfast.cache import save_manifest
+
+
+def test_publish_scheduler_waits_for_the_next_publish_date(tmp_path):
+    save_manifest(
+        str(tmp_path), {"version": 1, "pages": {}, "next_publish": "2999-01-01"}
+    )
+    scheduler = server.PublishScheduler("site", str(tmp_path))
+
+    scheduler.schedule()
+    try:
+        assert scheduler.timer is not None
+        assert scheduler.timer.interval > 0
+    finally:
+        scheduler.cancel()
+    assert scheduler.timer is None
+
+
+def test_publish_scheduler_rebuilds_due_pages(tmp_path, monkeypatch):
+    manifest = {
+        "version": 1,
+        "pages": {},
+        "scheduled": [{"filename": "post.md", "publish_date": "2000-01-01"}],
+        "next_publish": "2000-01-01",
+    }
+    save_manifest(str(tmp_path), manifest)
+    builds = []
+
+    def fake_generate_site(path, output, only=None):
+        builds.append((path, output, only))
+        save_manifest(output, {"version": 1, "pages": {}, "next_publish": None})
+
+    monkeypatch.setattr(server, "generate_site", fake_generate_site)
+    scheduler = server.PublishScheduler("site", str(tmp_path))
+    scheduler.publish()
+
+    ((path, output, only),) = builds
+    assert (path, output) == ("site", str(tmp_path))
+    assert "post.md" in only([{"filename": "post.md", "url": "/post.html"}])
+    assert scheduler.timer is None
+
+
+def test_metrics_endpoint_reports_requests_and_rebuilds(tmp_path, monkeypatch):
+    (tmp_path / "index.html").write_text("<p>Hello</p>", encoding="utf-8")
+    metrics = server.ServeMetrics(lambda: 2)
+    monkeypatch.setattr(
+        server, "generate_site", lambda path, output, only=None: {"pages": 3}
+    )
+    monkeypatch.setattr(server.MetricsRequestHandler, "log_message", print)
+    server.PublishScheduler("site", str(tmp_path), metrics).rebuild()
+    handler = partial(
+        server.MetricsRequestHandler, directory=str(tmp_path), metrics=metrics
+    )
+    httpd = socketserver.TCPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    try:
+        assert urlopen(f"{base}/index.html").read() == b"<p>Hello</p>"
+        with pytest.raises(HTTPError):
+            urlopen(f"{base}/missing.html")
+        with urlopen(f"{base}{server.METRICS_PATH}") as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            body = response.read().decode()
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+    assert 'slarti_http_request_duration_seconds_count{status="200"} 1' in body
+    assert 'slarti_http_request_duration_seconds_count{status="404"} 1' in body
+    assert 'slarti_rebuild_duration_seconds_count{trigger="change"} 1' in body
+    assert "slarti_rebuild_pages_sum 3" in body
+    assert "slarti_file_events_pending 2" in body
+    assert metrics.bytes_sent.value() > len("<p>Hello</p>")